@@ -2,17 +2,35 @@ from src.data.data_fetcher import StockDataFetcher
 from src.data.data_processor import DataProcessor
 from src.analysis.calculator import ReturnCalculator
 from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+from src.analysis.monte_carlo import MonteCarloSimulator
+from src.analysis.screener import StockScreener
 from src.visualization.chart_generator import ChartGenerator
+from src.database.result_cache import ResultCache
+from datetime import date
+import argparse
 import os
+import shutil
 from typing import Dict
 
 class StockAnalyzer:
-    def __init__(self):
+    # 进行蒙特卡洛模拟所需的最少日线数量
+    MIN_SIMULATION_DAYS = 20
+    
+    def __init__(self, interval: str = '1d'):
+        """
+        初始化分析器
+        
+        Args:
+            interval: K线周期，'1d' 为日线（近10年），'1h'、'5m' 等为日内周期
+        """
+        self.interval = interval
         self.data_fetcher = StockDataFetcher()
         self.data_processor = DataProcessor()
         self.calculator = ReturnCalculator()
         self.portfolio_analyzer = PortfolioAnalyzer()
+        self.simulator = MonteCarloSimulator(seed=42)
         self.chart_generator = ChartGenerator()
+        self.result_cache = ResultCache()
     
     def analyze_portfolio(self, portfolio_str: str):
         """
@@ -24,62 +42,190 @@ class StockAnalyzer:
         try:
             # 解析投资组合
             portfolio = self.portfolio_analyzer.parse_portfolio_input(portfolio_str)
+            save_path = "charts/portfolio_chart.png"
+            os.makedirs("charts", exist_ok=True)
             
-            # 存储每只股票的分析结果
-            stock_data = {}
-            returns = {}
-            volatilities = {}
-            drawdowns = {}
-            
-            # 分析每只股票
-            for stock_code in portfolio:
-                print(f"\n分析股票 {stock_code}...")
-                
-                # 1. 获取数据
-                df = self.data_fetcher.fetch_stock_data(stock_code)
-                df = self.data_processor.clean_data(df)
-                stock_data[stock_code] = df
-                
-                # 2. 计算回报率
-                total_return, annual_return = self.calculator.calculate_returns(df)
-                returns[stock_code] = total_return
-                
-                # 3. 计算风险指标
-                volatilities[stock_code] = self.portfolio_analyzer.calculate_volatility(df)
-                drawdowns[stock_code] = self.portfolio_analyzer.calculate_max_drawdown(df)
-                
-                # 4. 输出个股分析结果
-                print(f"股票 {stock_code} 分析结果:")
-                print(f"总回报率: {total_return:.2%}")
-                print(f"年化回报率: {annual_return:.2%}")
-                print(f"年化波动率: {volatilities[stock_code]:.2%}")
-                print(f"最大回撤: {drawdowns[stock_code]:.2%}")
+            # 先把本地数据更新到最新，增量写入的新数据会改变数据版本号
+            self.data_fetcher.sync_data(list(portfolio), self.interval)
             
-            # 计算投资组合整体回报率
-            portfolio_return = self.portfolio_analyzer.calculate_portfolio_return(
-                returns, portfolio
+            # 分析窗口为截至今天的K线周期和数据范围，数据版本号变化时缓存自动失效
+            window = (self.interval, date.today().isoformat())
+            cache_key = self.result_cache.make_key(
+                portfolio, window, self.data_fetcher.get_data_versions(list(portfolio), self.interval),
+                self.simulator.settings
             )
+            cached = self.result_cache.get(cache_key)
             
-            # 生成并保存投资组合走势图
-            save_path = "charts/portfolio_chart.png"
-            os.makedirs("charts", exist_ok=True)
-            self.chart_generator.generate_portfolio_chart(
-                stock_data,
-                portfolio,
-                save_path
-            )
-            print(f"\n投资组合走势图已保存至: {save_path}")
+            if cached is not None and cached[1] is not None:
+                print("\n使用缓存的分析结果（数据未更新）")
+                result, chart_path = cached
+                shutil.copyfile(chart_path, save_path)
+            else:
+                result = self._run_analysis(portfolio, save_path)
+                self.result_cache.set(cache_key, result, save_path)
             
-            # 输出投资组合分析结果
-            print("\n投资组合整体分析结果:")
-            print(f"总回报率: {portfolio_return:.2%}")
-            print(f"年化回报率: {((1 + portfolio_return) ** (1/10) - 1):.2%}")
+            self._print_result(result)
+            print(f"\n投资组合走势图已保存至: {save_path}")
             
         except Exception as e:
             print(f"分析过程中出现错误: {str(e)}")
+    
+    def _run_analysis(self, portfolio: Dict[str, float], save_path: str) -> Dict:
+        """
+        计算投资组合的全部分析指标并生成走势图
+        
+        Args:
+            portfolio: 字典 {股票代码: 占比}
+            save_path: 走势图保存路径
+            
+        Returns:
+            分析结果字典
+        """
+        # 存储每只股票的分析结果
+        stock_data = {}
+        stocks = {}
+        returns = {}
+        
+        # 分析每只股票
+        for stock_code in portfolio:
+            print(f"\n分析股票 {stock_code}...")
+            
+            # 1. 获取数据
+            if self.interval == '1d':
+                df = self.data_fetcher.fetch_stock_data(stock_code)
+            else:
+                df = self.data_fetcher.fetch_intraday_data(stock_code, self.interval)
+            df = self.data_processor.clean_data(df)
+            stock_data[stock_code] = df
+            
+            # 2. 计算回报率
+            total_return, annual_return = self.calculator.calculate_returns(df)
+            returns[stock_code] = total_return
+            
+            # 3. 计算风险指标
+            stocks[stock_code] = {
+                'total_return': total_return,
+                'annual_return': annual_return,
+                'volatility': self.portfolio_analyzer.calculate_volatility(df),
+                'max_drawdown': self.portfolio_analyzer.calculate_max_drawdown(df),
+            }
+        
+        # 计算投资组合整体回报率，年数按数据频率折算
+        portfolio_return = self.portfolio_analyzer.calculate_portfolio_return(
+            returns, portfolio
+        )
+        years = max(
+            len(df) / self.calculator.infer_periods_per_year(df.index)
+            for df in stock_data.values()
+        )
+        
+        # 生成并保存投资组合走势图
+        self.chart_generator.generate_portfolio_chart(
+            stock_data,
+            portfolio,
+            save_path
+        )
+        
+        # 蒙特卡洛模拟按日收益率抽样，日内数据先合成为日线
+        if self.interval != '1d':
+            stock_data = {
+                stock_code: self.data_processor.resample(df, '1D')
+                for stock_code, df in stock_data.items()
+            }
+        
+        # 蒙特卡洛模拟未来一年的风险分布，日线太少（如1分钟线只有约7天）时跳过
+        simulation = None
+        if min(len(df) for df in stock_data.values()) >= self.MIN_SIMULATION_DAYS:
+            simulation = self.simulator.simulate(stock_data, portfolio)
+        
+        return {
+            'stocks': stocks,
+            'portfolio_return': portfolio_return,
+            'years': years,
+            'simulation': simulation,
+        }
+    
+    @staticmethod
+    def _print_result(result: Dict):
+        """
+        输出分析结果
+        
+        Args:
+            result: _run_analysis 返回的分析结果
+        """
+        # 输出个股分析结果
+        for stock_code, metrics in result['stocks'].items():
+            print(f"\n股票 {stock_code} 分析结果:")
+            print(f"总回报率: {metrics['total_return']:.2%}")
+            print(f"年化回报率: {metrics['annual_return']:.2%}")
+            print(f"年化波动率: {metrics['volatility']:.2%}")
+            print(f"最大回撤: {metrics['max_drawdown']:.2%}")
+        
+        # 输出投资组合分析结果
+        portfolio_return = result['portfolio_return']
+        print("\n投资组合整体分析结果:")
+        print(f"总回报率: {portfolio_return:.2%}")
+        print(f"年化回报率: {((1 + portfolio_return) ** (1 / result['years']) - 1):.2%}")
+        
+        simulation = result['simulation']
+        if simulation is None:
+            print("\n日线数据不足，跳过蒙特卡洛模拟")
+            return
+        print(f"\n蒙特卡洛模拟（{simulation['n_paths']}条路径，未来{simulation['horizon']}个交易日）:")
+        print(f"回报率中位数: {simulation['terminal_return']['p50']:.2%}")
+        print(f"亏损概率: {simulation['prob_loss']:.2%}")
+        print(f"95% VaR: {simulation['var'][0.95]:.2%}")
+        print(f"95% CVaR: {simulation['cvar'][0.95]:.2%}")
+        print(f"最大回撤中位数: {simulation['max_drawdown']['p50']:.2%}")
+
+def screen(args):
+    """
+    筛选数据库中的全部股票并输出排名
+    
+    Args:
+        args: 命令行参数
+    """
+    try:
+        screener = StockScreener(n_workers=args.workers, years=args.years)
+        result = screener.screen(
+            filter_expr=args.filter,
+            sort_expr=args.sort,
+            top_k=args.top,
+            ascending=args.ascending
+        )
+        
+        print(f"共筛选出 {len(result)} 只股票:")
+        for rank, (stock_code, row) in enumerate(result.iterrows(), start=1):
+            print(f"{rank:>3}. {stock_code:<12} "
+                  f"年化回报率: {row['annual_return']:>8.2%}  "
+                  f"年化波动率: {row['volatility']:>8.2%}  "
+                  f"最大回撤: {row['max_drawdown']:>8.2%}")
+            
+    except Exception as e:
+        print(f"筛选过程中出现错误: {str(e)}")
 
 def main():
-    analyzer = StockAnalyzer()
+    parser = argparse.ArgumentParser(description="股票投资组合分析系统")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    screen_parser = subparsers.add_parser('screen', help="筛选数据库中的全部股票")
+    screen_parser.add_argument('--filter', help="筛选表达式，如 \"volatility < 0.3\"")
+    screen_parser.add_argument('--sort', default='annual_return', help="排序表达式，默认 annual_return")
+    screen_parser.add_argument('--top', type=int, default=50, help="输出的股票数量，默认50")
+    screen_parser.add_argument('--ascending', action='store_true', help="按升序排名")
+    screen_parser.add_argument('--workers', type=int, help="进程数，默认使用全部CPU核心")
+    screen_parser.add_argument('--years', type=int, default=10, help="计算指标使用的年数，默认10年")
+    
+    parser.add_argument('--interval', default='1d',
+                        choices=['1d', *StockDataFetcher.INTRADAY_MAX_DAYS],
+                        help="K线周期，默认日线（近10年）；日内周期使用Yahoo Finance可获取的最长范围")
+    
+    args = parser.parse_args()
+    if args.command == 'screen':
+        screen(args)
+        return
+    
+    analyzer = StockAnalyzer(interval=args.interval)
     
     while True:
         portfolio_str = input("请输入投资组合（格式如 AAPL:0.4,GOOGL:0.6）（按Q退出）: ")
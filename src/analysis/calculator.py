@@ -1,15 +1,50 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 class ReturnCalculator:
     @staticmethod
-    def calculate_returns(df: pd.DataFrame) -> Tuple[float, float]:
+    def infer_periods_per_year(index: pd.DatetimeIndex) -> float:
+        """
+        根据K线时间推断每年的K线数量，用于年化
+        
+        日线及以上周期按时间间隔推断（日线252、周线52、月线12等），
+        日内周期按平均每个交易日的K线数量乘以252推断，非时间索引按日线处理。
+        
+        Args:
+            index: K线时间索引
+            
+        Returns:
+            每年的K线数量
+        """
+        # 没有时间索引时无法推断，按日线处理
+        if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+            return 252
+        
+        median_gap = pd.Series(index).diff().median()
+        if median_gap < pd.Timedelta(hours=20):
+            bars_per_day = len(index) / index.normalize().nunique()
+            return bars_per_day * 252
+        
+        gap_days = median_gap / pd.Timedelta(days=1)
+        if gap_days <= 4:
+            return 252
+        if gap_days <= 10:
+            return 52
+        if gap_days <= 45:
+            return 12
+        if gap_days <= 120:
+            return 4
+        return 1
+    
+    @staticmethod
+    def calculate_returns(df: pd.DataFrame, periods_per_year: Optional[float] = None) -> Tuple[float, float]:
         """
         计算总回报率和年化回报率
         
         Args:
             df: 股票历史数据DataFrame
+            periods_per_year: 每年的K线数量，默认根据数据频率推断
             
         Returns:
             (总回报率, 年化回报率)
@@ -25,7 +60,9 @@ class ReturnCalculator:
             total_return = (final_price / initial_price) - 1
             
             # 计算年化收益率
-            years = len(df) / 252  # 假设每年约252个交易日
+            if periods_per_year is None:
+                periods_per_year = ReturnCalculator.infer_periods_per_year(df.index)
+            years = len(df) / periods_per_year
             annual_return = (1 + total_return) ** (1/years) - 1
             
             return total_return, annual_return
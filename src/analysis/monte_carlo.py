@@ -0,0 +1,267 @@
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+
+
+# 工作进程中的组合历史日收益率，由进程池初始化函数设置，避免每个任务重复序列化
+_worker_returns = None
+
+
+def _init_worker(portfolio_returns: np.ndarray):
+    """进程池初始化函数，每个工作进程只接收一次收益率序列"""
+    global _worker_returns
+    _worker_returns = portfolio_returns
+
+
+def _simulate_chunk(portfolio_returns: np.ndarray,
+                    mean: float,
+                    std: float,
+                    n_paths: int,
+                    horizon: int,
+                    method: str,
+                    block_size: int,
+                    seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    生成一批模拟路径并返回每条路径的终值回报率和最大回撤
+
+    Args:
+        portfolio_returns: 投资组合历史日收益率序列
+        mean: 日收益率均值（参数法使用）
+        std: 日收益率标准差（参数法使用）
+        n_paths: 本批路径数量
+        horizon: 每条路径的交易日数
+        method: 'bootstrap' 或 'normal'
+        block_size: 块自助法的块长度
+        seed: 本批随机种子
+
+    Returns:
+        (终值回报率数组, 最大回撤数组)
+    """
+    rng = np.random.default_rng(seed)
+
+    if method == 'bootstrap':
+        # 块自助法：随机抽取连续的历史片段拼接成路径，保留短期自相关
+        n_obs = len(portfolio_returns)
+        block_size = min(block_size, n_obs)
+        n_blocks = -(-horizon // block_size)
+        starts = rng.integers(0, n_obs - block_size + 1, size=(n_paths, n_blocks))
+        index = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :horizon]
+        daily = portfolio_returns[index]
+    else:
+        # 正态分布的尾部可能低于-100%，截断以免净值为负
+        daily = np.maximum(rng.normal(mean, std, size=(n_paths, horizon)), -1.0)
+
+    # 累计净值（初始为1）
+    wealth = np.cumprod(1 + daily, axis=1)
+    peak = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+    max_drawdown = (wealth / peak - 1).min(axis=1)
+    terminal_return = wealth[:, -1] - 1
+
+    return terminal_return, max_drawdown
+
+
+def _simulate_task(mean: float,
+                   std: float,
+                   chunks: List[Tuple[int, np.random.SeedSequence]],
+                   horizon: int,
+                   method: str,
+                   block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在工作进程中依次计算分配到的多个批次
+
+    定义在模块级别，以便进程池可以序列化调用。
+
+    Args:
+        mean: 日收益率均值
+        std: 日收益率标准差
+        chunks: [(路径数量, 随机种子)]
+        horizon: 每条路径的交易日数
+        method: 抽样方法
+        block_size: 块自助法的块长度
+
+    Returns:
+        (终值回报率数组, 最大回撤数组)
+    """
+    results = [
+        _simulate_chunk(_worker_returns, mean, std, n_paths, horizon, method, block_size, seed)
+        for n_paths, seed in chunks
+    ]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+class MonteCarloSimulator:
+    # 吞吐量目标：单进程下一年期（252个交易日）路径每秒至少生成10万条
+    TARGET_PATHS_PER_SECOND = 100_000
+    
+    # 每个工作进程至少分到的路径数量，低于此值时进程池的启动开销大于收益，改为单进程计算
+    MIN_PATHS_PER_WORKER = 100_000
+    
+    def __init__(self,
+                 n_paths: int = 20000,
+                 horizon: int = 252,
+                 method: str = 'bootstrap',
+                 block_size: int = 20,
+                 chunk_size: int = 5000,
+                 n_workers: Optional[int] = None,
+                 seed: Optional[int] = None):
+        """
+        初始化蒙特卡洛模拟器
+
+        Args:
+            n_paths: 模拟路径总数
+            horizon: 每条路径的交易日数，默认252（一年）
+            method: 抽样方法，'bootstrap'（块自助法）或 'normal'（多元正态分布）
+            block_size: 块自助法的块长度（交易日），为1时即普通自助法
+            chunk_size: 每批生成的路径数量，用于控制内存占用
+            n_workers: 进程池大小，为None或1时在当前进程中计算；
+                       路径总数不足以让每个进程分到 MIN_PATHS_PER_WORKER 条时同样在当前进程中计算
+            seed: 随机种子，相同种子得到相同结果（与进程数无关）
+        """
+        if method not in ('bootstrap', 'normal'):
+            raise ValueError(f"不支持的抽样方法: {method}")
+
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.method = method
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers
+        self.seed = seed
+
+    @property
+    def settings(self) -> Dict:
+        """影响模拟结果的参数，用于分析结果缓存键"""
+        return {
+            'n_paths': self.n_paths,
+            'horizon': self.horizon,
+            'method': self.method,
+            'block_size': self.block_size,
+            'seed': self.seed,
+        }
+
+    def simulate(self, stock_data: Dict[str, pd.DataFrame], portfolio: Dict[str, float]) -> Dict:
+        """
+        模拟投资组合未来走势并统计风险分布
+
+        组合按固定权重每日再平衡，因此先将历史收益率矩阵按权重合成为组合日收益率，
+        再对其抽样。参数法下组合日收益率服从 N(w·μ, wᵀΣw)，与先从多元正态分布
+        抽取个股收益再加权的结果同分布。权重按输入原样使用，与
+        calculate_portfolio_return 一致，权重之和小于1时剩余部分视为零收益。
+
+        Args:
+            stock_data: 字典，键为股票代码，值为该股票的DataFrame
+            portfolio: 字典，键为股票代码，值为权重
+
+        Returns:
+            包含终值回报率、年化回报率、最大回撤分布以及VaR/CVaR的字典
+        """
+        try:
+            returns = PortfolioAnalyzer.build_return_matrix(stock_data)
+            if len(returns) < 2:
+                raise ValueError("共同交易日不足，无法模拟")
+
+            weights = np.array([portfolio[code] for code in returns.columns], dtype=float)
+
+            portfolio_returns = returns.to_numpy() @ weights
+            mean = float(returns.mean().to_numpy() @ weights)
+            std = float(np.sqrt(weights @ returns.cov().to_numpy() @ weights))
+
+            # 按固定大小切分批次，每批使用独立的子种子，保证结果与并行方式无关
+            sizes = [self.chunk_size] * (self.n_paths // self.chunk_size)
+            if self.n_paths % self.chunk_size:
+                sizes.append(self.n_paths % self.chunk_size)
+            chunks = list(zip(sizes, np.random.SeedSequence(self.seed).spawn(len(sizes))))
+
+            n_workers = max(1, min(self.n_workers or 1, self.n_paths // self.MIN_PATHS_PER_WORKER, len(chunks)))
+
+            start_time = time.perf_counter()
+            if n_workers > 1:
+                # 每个进程分到一组连续的批次，收益率序列通过初始化函数只传输一次
+                tasks = [chunks[i * len(chunks) // n_workers:(i + 1) * len(chunks) // n_workers]
+                         for i in range(n_workers)]
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                         initargs=(portfolio_returns,)) as executor:
+                    results = list(executor.map(
+                        _simulate_task,
+                        [mean] * n_workers, [std] * n_workers, tasks,
+                        [self.horizon] * n_workers, [self.method] * n_workers,
+                        [self.block_size] * n_workers
+                    ))
+            else:
+                results = [
+                    _simulate_chunk(portfolio_returns, mean, std, n_paths, self.horizon,
+                                    self.method, self.block_size, seed)
+                    for n_paths, seed in chunks
+                ]
+            elapsed = time.perf_counter() - start_time
+            paths_per_second = self.n_paths / elapsed if elapsed > 0 else float('inf')
+
+            terminal_return = np.concatenate([r[0] for r in results])
+            max_drawdown = np.concatenate([r[1] for r in results])
+            annual_return = (1 + terminal_return) ** (252 / self.horizon) - 1
+
+            return {
+                'n_paths': self.n_paths,
+                'horizon': self.horizon,
+                'method': self.method,
+                'terminal_return': self._summarize(terminal_return),
+                'annual_return': self._summarize(annual_return),
+                'max_drawdown': self._summarize(max_drawdown),
+                'var': {level: self.calculate_var(terminal_return, level) for level in (0.95, 0.99)},
+                'cvar': {level: self.calculate_cvar(terminal_return, level) for level in (0.95, 0.99)},
+                'prob_loss': float((terminal_return < 0).mean()),
+                'elapsed': elapsed,
+                'n_workers': n_workers,
+                'paths_per_second': paths_per_second,
+                # 吞吐量目标按一年期路径折算，期限越长每条路径的计算量越大
+                'meets_target': paths_per_second * self.horizon / 252 >= self.TARGET_PATHS_PER_SECOND,
+            }
+
+        except Exception as e:
+            raise Exception(f"蒙特卡洛模拟失败: {str(e)}")
+
+    @staticmethod
+    def calculate_var(returns: np.ndarray, confidence: float = 0.95) -> float:
+        """
+        计算风险价值（VaR），以正数表示损失
+
+        Args:
+            returns: 模拟回报率数组
+            confidence: 置信水平
+
+        Returns:
+            VaR
+        """
+        return float(-np.quantile(returns, 1 - confidence))
+
+    @staticmethod
+    def calculate_cvar(returns: np.ndarray, confidence: float = 0.95) -> float:
+        """
+        计算条件风险价值（CVaR），即超过VaR部分的平均损失
+
+        Args:
+            returns: 模拟回报率数组
+            confidence: 置信水平
+
+        Returns:
+            CVaR
+        """
+        threshold = np.quantile(returns, 1 - confidence)
+        return float(-returns[returns <= threshold].mean())
+
+    @staticmethod
+    def _summarize(values: np.ndarray) -> Dict[str, float]:
+        """汇总分布的均值、标准差和分位数"""
+        percentiles = np.percentile(values, [5, 25, 50, 75, 95])
+        return {
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'p5': float(percentiles[0]),
+            'p25': float(percentiles[1]),
+            'p50': float(percentiles[2]),
+            'p75': float(percentiles[3]),
+            'p95': float(percentiles[4]),
+        }
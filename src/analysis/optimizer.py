@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from typing import Dict, Optional, Tuple
+from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+
+class PortfolioOptimizer:
+    def __init__(self,
+                 returns: pd.DataFrame,
+                 risk_free_rate: float = 0.0,
+                 bounds: Tuple[float, float] = (0.0, 1.0)):
+        """
+        初始化权重优化器
+
+        收益率矩阵和协方差矩阵只计算一次，所有优化方法共用。
+
+        Args:
+            returns: 日收益率矩阵，每列为一只股票
+            risk_free_rate: 年化无风险利率
+            bounds: 每只股票权重的上下限
+        """
+        self.codes = list(returns.columns)
+        self.n_assets = len(self.codes)
+        self.risk_free_rate = risk_free_rate
+
+        lower, upper = bounds
+        if self.n_assets == 0:
+            raise ValueError("没有可优化的股票")
+        if lower * self.n_assets > 1 + 1e-9 or upper * self.n_assets < 1 - 1e-9:
+            raise ValueError(f"权重上下限 {bounds} 无法满足权重之和为1")
+        self.bounds = [(lower, upper)] * self.n_assets
+
+        # 年化预期收益率和协方差矩阵（假设一年252个交易日）
+        self.mean_returns = returns.mean().to_numpy() * 252
+        self.cov_matrix = returns.cov().to_numpy() * 252
+
+        self._sum_constraint = {
+            'type': 'eq',
+            'fun': lambda w: w.sum() - 1,
+            'jac': lambda w: np.ones_like(w)
+        }
+
+    @classmethod
+    def from_stock_data(cls, stock_data: Dict[str, pd.DataFrame], **kwargs) -> 'PortfolioOptimizer':
+        """
+        从股票数据构建优化器
+
+        Args:
+            stock_data: 字典，键为股票代码，值为该股票的DataFrame
+            **kwargs: 传递给构造函数的其他参数
+
+        Returns:
+            PortfolioOptimizer实例
+        """
+        return cls(PortfolioAnalyzer.build_return_matrix(stock_data), **kwargs)
+
+    def portfolio_performance(self, weights: np.ndarray) -> Tuple[float, float, float]:
+        """
+        计算给定权重下的组合表现
+
+        Args:
+            weights: 权重向量
+
+        Returns:
+            (年化收益率, 年化波动率, 夏普比率)
+        """
+        annual_return = float(weights @ self.mean_returns)
+        volatility = float(np.sqrt(weights @ self.cov_matrix @ weights))
+        sharpe = (annual_return - self.risk_free_rate) / volatility if volatility > 0 else 0.0
+        return annual_return, volatility, sharpe
+
+    def min_variance(self, x0: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """
+        求最小方差组合权重
+
+        Args:
+            x0: 初始权重，用于热启动
+
+        Returns:
+            字典 {股票代码: 权重}
+        """
+        return self._to_dict(self._min_variance(x0))
+
+    def max_sharpe(self, x0: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """
+        求最大夏普比率组合权重
+
+        Args:
+            x0: 初始权重，用于热启动
+
+        Returns:
+            字典 {股票代码: 权重}
+        """
+        def objective(w):
+            excess = w @ self.mean_returns - self.risk_free_rate
+            cov_w = self.cov_matrix @ w
+            volatility = np.sqrt(w @ cov_w)
+            value = -excess / volatility
+            grad = -(self.mean_returns * volatility - excess * cov_w / volatility) / volatility ** 2
+            return value, grad
+
+        weights = self._solve(objective, x0 if x0 is not None else self._min_variance())
+        return self._to_dict(weights)
+
+    def risk_parity(self, x0: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """
+        求风险平价组合权重，使每只股票对组合方差的贡献相等
+
+        Args:
+            x0: 初始权重，用于热启动
+
+        Returns:
+            字典 {股票代码: 权重}
+        """
+        def objective(w):
+            cov_w = self.cov_matrix @ w
+            variance = w @ cov_w
+            contributions = w * cov_w / variance
+            return np.sum((contributions - 1 / self.n_assets) ** 2)
+
+        if x0 is None:
+            # 以波动率倒数加权作为初始值，通常已接近最优解
+            inverse_vol = 1 / np.sqrt(np.diag(self.cov_matrix))
+            x0 = inverse_vol / inverse_vol.sum()
+
+        return self._to_dict(self._solve(objective, x0, jac=False))
+
+    def efficient_frontier(self, n_points: int = 100) -> pd.DataFrame:
+        """
+        计算有效前沿
+
+        从最小方差组合的收益率到可达到的最高收益率之间等距取目标收益率，
+        依次求解最小方差问题，每一点都以上一点的解热启动。未收敛的点直接跳过；
+        权重上下限只允许一个可行组合（如4只股票上限均为25%）时收益率区间退化，只返回一行。
+
+        Args:
+            n_points: 前沿上的点数
+
+        Returns:
+            DataFrame，包含每个点的年化收益率、年化波动率、夏普比率和各股票权重
+        """
+        try:
+            weights = self._min_variance()
+            min_return = float(weights @ self.mean_returns)
+            max_return = float(self._max_return_weights() @ self.mean_returns)
+
+            rows = [[*self.portfolio_performance(weights), *weights]]
+            if max_return - min_return > 1e-9 * max(1.0, abs(max_return)):
+                for target in np.linspace(min_return, max_return, n_points)[1:]:
+                    target_constraint = {
+                        'type': 'eq',
+                        'fun': lambda w, t=target: w @ self.mean_returns - t,
+                        'jac': lambda w: self.mean_returns
+                    }
+                    try:
+                        weights = self._solve(self._variance, weights, extra_constraints=[target_constraint])
+                    except ValueError:
+                        continue
+                    rows.append([*self.portfolio_performance(weights), *weights])
+
+            return pd.DataFrame(rows, columns=['return', 'volatility', 'sharpe', *self.codes])
+
+        except Exception as e:
+            raise Exception(f"计算有效前沿失败: {str(e)}")
+
+    def _variance(self, w: np.ndarray) -> Tuple[float, np.ndarray]:
+        """组合方差及其梯度"""
+        cov_w = self.cov_matrix @ w
+        return w @ cov_w, 2 * cov_w
+
+    def _min_variance(self, x0: Optional[np.ndarray] = None) -> np.ndarray:
+        """求最小方差组合的权重向量"""
+        return self._solve(self._variance, x0)
+
+    def _max_return_weights(self) -> np.ndarray:
+        """
+        在权重上下限约束下求最高收益率组合
+
+        该问题是线性规划，按预期收益率从高到低依次填满上限即为最优解。
+        """
+        lower, upper = self.bounds[0]
+        weights = np.full(self.n_assets, lower)
+        remaining = 1 - weights.sum()
+        for i in np.argsort(-self.mean_returns):
+            add = min(upper - lower, remaining)
+            weights[i] += add
+            remaining -= add
+            if remaining <= 0:
+                break
+        return weights
+
+    def _solve(self, objective, x0: Optional[np.ndarray] = None, jac: bool = True,
+               extra_constraints: Optional[list] = None) -> np.ndarray:
+        """
+        在权重之和为1及上下限约束下最小化目标函数
+
+        Args:
+            objective: 目标函数，jac为True时需同时返回梯度
+            x0: 初始权重，默认等权重
+            jac: 目标函数是否返回梯度
+            extra_constraints: 额外的约束条件
+
+        Returns:
+            最优权重向量
+        """
+        if x0 is None:
+            x0 = np.full(self.n_assets, 1 / self.n_assets)
+
+        constraints = [self._sum_constraint] + (extra_constraints or [])
+        result = minimize(
+            objective,
+            x0,
+            jac=jac,
+            method='SLSQP',
+            bounds=self.bounds,
+            constraints=constraints,
+            options={'maxiter': 500, 'ftol': 1e-12}
+        )
+        if not result.success:
+            raise ValueError(f"优化未收敛: {result.message}")
+
+        lower, upper = self.bounds[0]
+        return np.clip(result.x, lower, upper)
+
+    def _to_dict(self, weights: np.ndarray) -> Dict[str, float]:
+        """将权重向量转换为 {股票代码: 权重} 字典"""
+        return {code: float(w) for code, w in zip(self.codes, weights)}
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from src.analysis.calculator import ReturnCalculator
 
 class PortfolioAnalyzer:
     @staticmethod
@@ -58,21 +59,42 @@ class PortfolioAnalyzer:
         return total_return
     
     @staticmethod
-    def calculate_volatility(df: pd.DataFrame) -> float:
+    def build_return_matrix(stock_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        构建对齐后的日收益率矩阵
+        
+        Args:
+            stock_data: 字典，键为股票代码，值为该股票的DataFrame
+            
+        Returns:
+            DataFrame，每列为一只股票的日收益率，只保留所有股票共同的交易日
+        """
+        closes = pd.concat(
+            {code: df['close'] for code, df in stock_data.items()},
+            axis=1,
+            join='inner'
+        )
+        return closes.pct_change().dropna()
+    
+    @staticmethod
+    def calculate_volatility(df: pd.DataFrame, periods_per_year: Optional[float] = None) -> float:
         """
         计算股票的年化波动率
         
         Args:
             df: 股票历史数据DataFrame
+            periods_per_year: 每年的K线数量，默认根据数据频率推断
             
         Returns:
             年化波动率
         """
-        # 计算日收益率
+        # 计算每根K线的收益率
         daily_returns = df['close'].pct_change().dropna()
         
-        # 计算年化波动率（假设一年252个交易日）
-        annual_volatility = daily_returns.std() * np.sqrt(252)
+        # 计算年化波动率（日线为一年252个交易日）
+        if periods_per_year is None:
+            periods_per_year = ReturnCalculator.infer_periods_per_year(df.index)
+        annual_volatility = daily_returns.std() * np.sqrt(periods_per_year)
         
         return annual_volatility
     
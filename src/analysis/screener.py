@@ -0,0 +1,187 @@
+import heapq
+import math
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import List, Optional, Tuple
+from src.data.data_processor import DataProcessor
+from src.database.db_manager import DatabaseManager
+
+# 单个分片的最大股票数量，避免超出SQLite的参数个数限制
+MAX_SHARD_SIZE = 500
+
+METRIC_COLUMNS = ['total_return', 'annual_return', 'volatility', 'max_drawdown', 'days']
+
+
+def calculate_universe_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    按股票分组向量化计算回报率和风险指标
+
+    计算口径与ReturnCalculator、PortfolioAnalyzer一致（一年252个交易日）。
+
+    Args:
+        df: 复权后的数据，包含stock_code和close列，按股票代码和日期排序
+
+    Returns:
+        DataFrame，以股票代码为索引，包含各项指标
+    """
+    grouped = df.groupby('stock_code', sort=False)['close']
+
+    days = grouped.size()
+    total_return = grouped.last() / grouped.first() - 1
+    annual_return = (1 + total_return) ** (252 / days) - 1
+
+    daily_returns = grouped.pct_change()
+    volatility = daily_returns.groupby(df['stock_code'], sort=False).std() * np.sqrt(252)
+
+    drawdown = df['close'] / grouped.cummax() - 1
+    max_drawdown = drawdown.groupby(df['stock_code'], sort=False).min()
+
+    return pd.DataFrame({
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'volatility': volatility,
+        'max_drawdown': max_drawdown,
+        'days': days,
+    })
+
+
+def _screen_shard(db_path: str,
+                  stock_codes: List[str],
+                  start_date: str,
+                  end_date: str,
+                  filter_expr: Optional[str],
+                  sort_expr: str,
+                  ascending: bool,
+                  top_k: int) -> List[Tuple[float, str, dict]]:
+    """
+    在工作进程中筛选一个分片
+
+    直接从数据库读取分片数据，只把排名前top_k的紧凑结果返回主进程。
+
+    Args:
+        db_path: 数据库文件路径
+        stock_codes: 分片内的股票代码
+        start_date: 开始日期
+        end_date: 结束日期
+        filter_expr: 筛选表达式
+        sort_expr: 排序表达式
+        ascending: 是否升序
+        top_k: 返回的结果数量
+
+    Returns:
+        [(排序分数, 股票代码, 指标字典)]，分数越大排名越靠前
+    """
+    db_manager = DatabaseManager(db_path)
+    raw = db_manager.get_universe_data(stock_codes, start_date, end_date)
+    if len(raw) == 0:
+        return []
+
+    # 按股票复权
+    actions = db_manager.get_universe_actions(stock_codes)
+    actions_by_code = dict(tuple(actions.groupby('stock_code', sort=False)))
+    adjusted = pd.concat([
+        DataProcessor.adjust_prices(group, actions_by_code.get(code))
+        for code, group in raw.groupby('stock_code', sort=False)
+    ])
+
+    metrics = calculate_universe_metrics(adjusted)
+    metrics = metrics[metrics['days'] >= 2]
+    if filter_expr:
+        metrics = metrics.query(filter_expr)
+    if len(metrics) == 0:
+        return []
+
+    score = metrics.eval(sort_expr)
+    if ascending:
+        score = -score
+    score = score.dropna().nlargest(top_k)
+
+    return [
+        (float(value), code, metrics.loc[code].to_dict())
+        for code, value in score.items()
+    ]
+
+
+class StockScreener:
+    def __init__(self, db_path: str = "stock_data.db", n_workers: Optional[int] = None, years: int = 10):
+        """
+        初始化全市场筛选器
+
+        Args:
+            db_path: 数据库文件路径
+            n_workers: 进程池大小，默认使用全部CPU核心
+            years: 计算指标使用的年数，默认10年
+        """
+        self.db_path = db_path
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.years = years
+        self.db_manager = DatabaseManager(db_path)
+
+    def screen(self,
+               filter_expr: Optional[str] = None,
+               sort_expr: str = 'annual_return',
+               top_k: int = 50,
+               ascending: bool = False) -> pd.DataFrame:
+        """
+        对数据库中的全部股票进行筛选和排名
+
+        Args:
+            filter_expr: 筛选表达式，如 "volatility < 0.3 and days > 1000"
+            sort_expr: 排序表达式，如 "annual_return / volatility"
+            top_k: 返回的股票数量
+            ascending: 是否按升序排名
+
+        Returns:
+            DataFrame，以股票代码为索引，包含排序分数和各项指标
+        """
+        try:
+            # 在空表上预先检查表达式，避免错误在每个工作进程中重复出现
+            empty = pd.DataFrame(columns=METRIC_COLUMNS, dtype=float)
+            if filter_expr:
+                empty.query(filter_expr)
+            if not isinstance(empty.eval(sort_expr), pd.Series):
+                raise ValueError(f"排序表达式必须包含指标列: {sort_expr}")
+
+            stock_codes = self.db_manager.get_stock_codes()
+            if not stock_codes:
+                return pd.DataFrame(columns=['score', *METRIC_COLUMNS])
+
+            # 分片数量多于进程数，使各进程负载更均衡
+            n_shards = max(self.n_workers * 4, math.ceil(len(stock_codes) / MAX_SHARD_SIZE))
+            shards = [stock_codes[i::n_shards] for i in range(n_shards)]
+            shards = [shard for shard in shards if shard]
+
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=self.years*365)
+
+            args = (
+                repeat(self.db_path), shards,
+                repeat(start_date.strftime('%Y-%m-%d')), repeat(end_date.strftime('%Y-%m-%d')),
+                repeat(filter_expr), repeat(sort_expr), repeat(ascending), repeat(top_k)
+            )
+
+            if self.n_workers > 1:
+                with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                    shard_results = list(executor.map(_screen_shard, *args))
+            else:
+                shard_results = list(map(_screen_shard, *args))
+
+            # 用堆合并各分片的前top_k结果
+            top = heapq.nlargest(
+                top_k,
+                (item for result in shard_results for item in result),
+                key=lambda item: item[0]
+            )
+
+            rows = [
+                {'stock_code': code, 'score': -score if ascending else score, **metrics}
+                for score, code, metrics in top
+            ]
+            return pd.DataFrame(rows, columns=['stock_code', 'score', *METRIC_COLUMNS]).set_index('stock_code')
+
+        except Exception as e:
+            raise Exception(f"筛选股票失败: {str(e)}")
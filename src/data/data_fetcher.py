@@ -1,10 +1,34 @@
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from src.database.db_manager import DatabaseManager
+from src.data.data_processor import DataProcessor
 
 class StockDataFetcher:
+    # Yahoo Finance各日内周期可获取的最大天数
+    INTRADAY_MAX_DAYS = {
+        '1m': 7,
+        '2m': 60,
+        '5m': 60,
+        '15m': 60,
+        '30m': 60,
+        '60m': 730,
+        '90m': 60,
+        '1h': 730,
+    }
+    
+    # 各交易所的时区和收盘时间，按股票代码后缀匹配，没有后缀的按美股处理
+    EXCHANGE_SESSIONS = {
+        '.SS': ('Asia/Shanghai', '15:00'),
+        '.SZ': ('Asia/Shanghai', '15:00'),
+        '.HK': ('Asia/Hong_Kong', '16:00'),
+    }
+    DEFAULT_SESSION = ('America/New_York', '16:00')
+    
+    # 收盘后等待Yahoo Finance生成完整K线的时间
+    SESSION_SETTLE = timedelta(minutes=30)
+    
     def __init__(self):
         """初始化数据获取器，设置数据库管理器"""
         self.db_manager = DatabaseManager()
@@ -31,50 +55,298 @@ class StockDataFetcher:
                 
         return stock_code
 
+    def _exchange_session(self, formatted_code: str) -> Tuple[str, str]:
+        """
+        获取股票所在交易所的时区和收盘时间
+        
+        Args:
+            formatted_code: 格式化后的股票代码
+            
+        Returns:
+            (时区名称, 收盘时间 HH:MM)
+        """
+        for suffix, session in self.EXCHANGE_SESSIONS.items():
+            if formatted_code.endswith(suffix):
+                return session
+        return self.DEFAULT_SESSION
+    
+    def _exchange_now(self, formatted_code: str) -> datetime:
+        """获取交易所当地的当前时间（不带时区）"""
+        tz, _ = self._exchange_session(formatted_code)
+        return pd.Timestamp.now(tz).tz_localize(None).to_pydatetime()
+    
+    def _last_session_close(self, formatted_code: str, now: Optional[datetime] = None) -> datetime:
+        """
+        获取最近一个已收盘交易日的收盘时间（按工作日估算）
+        
+        当天收盘并经过 SESSION_SETTLE 之后返回当天的收盘时间，否则返回上一个工作日的；
+        节假日无法识别，由同步记录避免重复请求。
+        
+        Args:
+            formatted_code: 格式化后的股票代码
+            now: 当前时间（带时区），默认为系统当前时间
+            
+        Returns:
+            收盘时间（交易所当地时间，不带时区）
+        """
+        tz, close = self._exchange_session(formatted_code)
+        now = pd.Timestamp.now(tz) if now is None else pd.Timestamp(now).tz_convert(tz)
+        local_now = now.tz_localize(None)
+        
+        session = local_now.normalize()
+        close_time = pd.Timedelta(f"{close}:00")
+        if session.weekday() >= 5 or local_now < session + close_time + self.SESSION_SETTLE:
+            session -= pd.offsets.BDay(1)
+        return (session + close_time).to_pydatetime()
+    
+    def _synced_since(self, sync_key: str, since: datetime) -> bool:
+        """
+        判断在指定时间之后是否已成功请求过Yahoo Finance
+        
+        Args:
+            sync_key: 同步记录的键，日线为股票代码，日内数据为 intraday_version_key 返回的键
+            since: 交易所当地时间
+            
+        Returns:
+            是否已请求过
+        """
+        checked_time = self.db_manager.get_sync_time(sync_key)
+        return checked_time is not None and checked_time >= since
+
+    def _download_history(self, formatted_code: str, start_date: datetime, end_date: datetime) -> bool:
+        """
+        从Yahoo Finance下载历史数据，拆分为原始价格和公司行为后保存到数据库
+        
+        Args:
+            formatted_code: 格式化后的股票代码
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            是否获取到数据
+        """
+        stock = yf.Ticker(formatted_code)
+        history = stock.history(start=start_date, end=end_date, auto_adjust=False, actions=True)
+        
+        if history is None or len(history) == 0:
+            return False
+        
+        prices, actions = DataProcessor.unadjust_history(history)
+        self.db_manager.save_stock_data(formatted_code, prices)
+        self.db_manager.save_corporate_actions(formatted_code, actions)
+        return True
+
+    def sync_stock_data(self, stock_code: str, years: int = 10):
+        """
+        同步股票日线数据：本地没有数据时完整下载，数据过期时只增量下载缺少的交易日
+        
+        本地数据已包含最近一个已收盘的交易日，或该交易日收盘后已请求过（如节假日没有新K线）时
+        不访问网络，开销只有两次数据库查询。
+        
+        Args:
+            stock_code: 股票代码
+            years: 首次下载的年数，默认10年
+        """
+        formatted_code = self._format_stock_code(stock_code)
+        last_close = self._last_session_close(formatted_code)
+        # Yahoo Finance的结束日期不包含当天，取收盘日的下一天
+        end_date = datetime(last_close.year, last_close.month, last_close.day) + timedelta(days=1)
+        latest_date = self.db_manager.get_latest_date(formatted_code)
+        
+        if latest_date is None:
+            print(f"从Yahoo Finance获取股票 {formatted_code} 的数据...")
+            start_date = end_date - timedelta(days=years*365)
+            checked_time = self._exchange_now(formatted_code)
+            if not self._download_history(formatted_code, start_date, end_date):
+                raise Exception("无法获取股票数据")
+            self.db_manager.save_sync_time(formatted_code, checked_time)
+        elif (latest_date < last_close.strftime('%Y-%m-%d')
+              and not self._synced_since(formatted_code, last_close)):
+            # 从最新交易日开始重新获取，覆盖可能不完整的最后一根K线
+            print(f"从Yahoo Finance增量更新股票 {formatted_code} 的数据...")
+            checked_time = self._exchange_now(formatted_code)
+            try:
+                self._download_history(
+                    formatted_code,
+                    datetime.strptime(latest_date, '%Y-%m-%d'),
+                    end_date
+                )
+            except Exception as e:
+                print(f"增量更新失败，使用本地数据: {str(e)}")
+                return
+            # 没有返回新K线时同样记录，下一个交易日收盘前不再请求
+            self.db_manager.save_sync_time(formatted_code, checked_time)
+
     def fetch_stock_data(self, stock_code: str, years: int = 10) -> pd.DataFrame:
         """
-        获取股票历史数据，优先从本地数据库获取，如果没有则从Yahoo Finance获取
+        获取股票复权后的历史数据，优先从本地数据库获取
+        
+        数据库中保存原始价格和公司行为，本地数据过期时只增量下载缺少的交易日，
+        新出现的分红或拆股在读取时通过复权因子作用于全部历史数据，无需重新下载。
         
         Args:
             stock_code: 股票代码
             years: 获取年数，默认10年
             
         Returns:
-            DataFrame包含OHLCV数据
+            DataFrame包含复权后的OHLCV数据
         """
         try:
             # 格式化股票代码
             formatted_code = self._format_stock_code(stock_code)
             
-            # 计算日期范围
-            end_date = datetime.now()
+            # 计算日期范围，以交易所当地日期为准
+            end_date = self._exchange_now(formatted_code)
             start_date = end_date - timedelta(days=years*365)
             
-            # 尝试从数据库获取数据
+            self.sync_stock_data(stock_code, years)
+            
             df = self.db_manager.get_stock_data(
                 formatted_code, 
                 start_date.strftime('%Y-%m-%d'),
                 end_date.strftime('%Y-%m-%d')
             )
-            
             if df is None or len(df) == 0:
-                print(f"从Yahoo Finance获取股票 {formatted_code} 的数据...")
-                # 从Yahoo Finance获取数据
-                stock = yf.Ticker(formatted_code)
-                df = stock.history(start=start_date, end=end_date)
-                
-                if df is not None and len(df) > 0:
-                    # 保存到数据库
-                    self.db_manager.save_stock_data(formatted_code, df)
-                else:
-                    raise Exception("无法获取股票数据")
-            else:
-                print(f"从本地数据库获取股票 {formatted_code} 的数据...")
+                raise Exception("无法获取股票数据")
             
-            return df
+            # 按公司行为复权
+            actions = self.db_manager.get_corporate_actions(formatted_code)
+            return DataProcessor.adjust_prices(df, actions)
             
         except Exception as e:
             raise Exception(f"获取股票数据失败: {str(e)}")
+    
+    def sync_intraday_data(self, stock_code: str, interval: str = '1h', days: Optional[int] = None):
+        """
+        同步股票日内K线数据：本地没有数据时下载，数据过期时增量下载
+        
+        与日线相同，以交易所时区中最近一个已收盘交易日为准：本地已有该交易日的最后一根K线，
+        或该交易日收盘后已请求过时不访问网络，盘中不获取未完成交易日的K线。
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期，如 '1m'、'5m'、'15m'、'1h'
+            days: 首次下载的天数，默认为该周期可获取的最大天数
+        """
+        formatted_code = self._format_stock_code(stock_code)
+        if interval not in self.INTRADAY_MAX_DAYS:
+            raise ValueError(f"不支持的K线周期: {interval}")
+        if days is None:
+            days = self.INTRADAY_MAX_DAYS[interval]
+        
+        sync_key = self.db_manager.intraday_version_key(formatted_code, interval)
+        last_close = self._last_session_close(formatted_code)
+        latest_time = self.db_manager.get_latest_intraday_time(formatted_code, interval)
+        
+        # 交易日最后一根K线的开始时间晚于收盘时间减去一个周期
+        unit = timedelta(minutes=1) if interval.endswith('m') else timedelta(hours=1)
+        last_bar = last_close - int(interval[:-1]) * unit
+        if latest_time is not None and (latest_time >= last_bar or self._synced_since(sync_key, last_close)):
+            return
+        
+        # Yahoo Finance的结束日期不包含当天，取收盘日的下一天
+        end_date = datetime(last_close.year, last_close.month, last_close.day) + timedelta(days=1)
+        start_date = end_date - timedelta(days=days)
+        download_start = start_date if latest_time is None else max(start_date, latest_time)
+        
+        print(f"从Yahoo Finance获取股票 {formatted_code} 的{interval}数据...")
+        checked_time = self._exchange_now(formatted_code)
+        try:
+            stock = yf.Ticker(formatted_code)
+            history = stock.history(
+                start=download_start, end=end_date, interval=interval, auto_adjust=False, actions=True
+            )
+            if history is not None and len(history) > 0:
+                # 与日线相同，按同一批数据中的拆股还原为原始价格，读取时统一复权
+                prices, actions = DataProcessor.unadjust_history(history, intraday=True)
+                self.db_manager.save_intraday_data(formatted_code, interval, prices)
+                self.db_manager.save_corporate_actions(formatted_code, actions)
+        except Exception as e:
+            if latest_time is None:
+                raise
+            print(f"增量更新失败，使用本地数据: {str(e)}")
+            return
+        # 没有返回新K线时同样记录，下一个交易日收盘前不再请求
+        self.db_manager.save_sync_time(sync_key, checked_time)
+            
+    def fetch_intraday_data(self, stock_code: str, interval: str = '1h', days: Optional[int] = None) -> pd.DataFrame:
+        """
+        获取股票复权后的日内K线数据，优先从本地数据库获取，本地数据过期时增量下载
+        
+        与日线相同，数据库中保存原始价格，读取时按公司行为复权。
+        
+        Yahoo Finance对日内数据的可获取范围有限制：1分钟线约7天，
+        其他分钟线约60天，小时线约730天。
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期，如 '1m'、'5m'、'15m'、'1h'
+            days: 获取天数，默认为该周期可获取的最大天数
+            
+        Returns:
+            DataFrame包含复权后的OHLCV数据，以交易所当地时间为索引
+        """
+        try:
+            # 格式化股票代码
+            formatted_code = self._format_stock_code(stock_code)
+            
+            self.sync_intraday_data(stock_code, interval, days)
+            if days is None:
+                days = self.INTRADAY_MAX_DAYS[interval]
+            
+            # 计算日期范围，以交易所当地日期为准
+            end_date = self._exchange_now(formatted_code)
+            start_date = end_date - timedelta(days=days)
+            
+            df = self.db_manager.get_intraday_data(
+                formatted_code,
+                interval,
+                start_date.strftime('%Y-%m-%d'),
+                end_date.strftime('%Y-%m-%d')
+            )
+            if df is None or len(df) == 0:
+                raise Exception("无法获取股票数据")
+            
+            # 按公司行为复权，除权除息日之前的全部K线按同一因子缩放
+            actions = self.db_manager.get_corporate_actions(formatted_code)
+            return DataProcessor.adjust_prices(df, actions)
+            
+        except Exception as e:
+            raise Exception(f"获取日内数据失败: {str(e)}")
+    
+    def sync_data(self, stock_codes: List[str], interval: str = '1d'):
+        """
+        同步多只股票的数据，用于在读取数据版本号之前把本地数据更新到最新
+        
+        Args:
+            stock_codes: 股票代码列表
+            interval: K线周期，'1d' 为日线，其他为日内周期
+        """
+        for stock_code in stock_codes:
+            try:
+                if interval == '1d':
+                    self.sync_stock_data(stock_code)
+                else:
+                    self.sync_intraday_data(stock_code, interval)
+            except Exception as e:
+                raise Exception(f"获取股票数据失败: {str(e)}")
+            
+    def get_data_versions(self, stock_codes: List[str], interval: str = '1d') -> Dict[str, int]:
+        """
+        获取股票在本地数据库中的数据版本号
+        
+        Args:
+            stock_codes: 股票代码列表
+            interval: K线周期，'1d' 为日线，其他为日内周期
+            
+        Returns:
+            字典 {版本键: 版本号}，日线以格式化后的股票代码为键；
+            日内数据读取时按公司行为复权，同时包含日线版本号（公司行为变化时递增）
+        """
+        formatted_codes = [self._format_stock_code(code) for code in stock_codes]
+        if interval != '1d':
+            formatted_codes += [self.db_manager.intraday_version_key(code, interval) for code in formatted_codes]
+        return self.db_manager.get_data_versions(formatted_codes)
             
     def update_stock_data(self, stock_code: str):
         """
@@ -84,14 +356,11 @@ class StockDataFetcher:
             stock_code: 股票代码
         """
         try:
-            # 获取最新的完整数据
-            df = self.fetch_stock_data(stock_code)
+            # 获取数据时会自动增量更新数据库
+            self.fetch_stock_data(stock_code)
             
-            # 保存到数据库
             formatted_code = self._format_stock_code(stock_code)
-            self.db_manager.save_stock_data(formatted_code, df)
-            
             print(f"股票 {formatted_code} 数据已更新")
             
         except Exception as e:
-            print(f"更新股票数据失败: {str(e)}") 
\ No newline at end of file
+            print(f"更新股票数据失败: {str(e)}")
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from pandas.tseries.frequencies import to_offset
+from typing import Tuple
 
 class DataProcessor:
     @staticmethod
@@ -13,19 +15,87 @@ class DataProcessor:
         Returns:
             清理后的DataFrame
         """
-        # 删除空值
-        df = df.dropna()
+        # 统一列名为小写
+        df = df.copy()
+        df.columns = df.columns.str.lower()
         
         # 确保所有必需的列都存在
-        required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        required_columns = ['open', 'high', 'low', 'close', 'volume']
         if not all(col in df.columns for col in required_columns):
             raise ValueError("数据缺少必需的列")
         
-        # 统一列名为小写
-        df.columns = df.columns.str.lower()
+        # 只保留OHLCV，公司行为（分红、拆股）单独存储，已体现在复权价格中
+        df = df[required_columns]
+        
+        # 删除空值
+        df = df.dropna()
             
         return df
     
+    @staticmethod
+    def resample(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+        """
+        将OHLCV数据重采样为任意周期的K线
+        
+        不超过一天的固定周期（如 '5min'、'7min'、'1h'、'1D'）直接在整数时间戳上分桶，
+        用 reduceat 一次完成聚合，只输出有数据的K线，适合大量分钟数据；
+        其他周期（如 'W'、'ME'）使用pandas的日历重采样。
+        
+        分桶方式与pandas默认的 origin='start_day' 一致：日内周期从第一天当地零点起
+        按实际经过的时间划分，夏令时结束时重复的当地时间分属两根K线；日线按当地日期划分。
+        
+        Args:
+            df: 原始数据框，日期应该是索引，并按时间排序
+            rule: 目标周期，pandas频率字符串
+        Returns:
+            重采样后的数据框
+        """
+        try:
+            width = pd.Timedelta(rule)
+        except ValueError:
+            width = None
+        
+        if width is None or width > pd.Timedelta(days=1) or len(df) == 0:
+            return df.resample(rule).agg({
+                'open': 'first',
+                'high': 'max',
+                'low': 'min',
+                'close': 'last',
+                'volume': 'sum'
+            })
+        
+        index = df.index
+        daily = isinstance(to_offset(rule), pd.offsets.Day)
+        if daily:
+            # 日线按当地日期分桶
+            local_index = index.tz_localize(None) if index.tz is not None else index
+            buckets = local_index.values.astype('datetime64[D]').astype(np.int64)
+        else:
+            # 以第一天当地零点为起点，按实际经过的时间（带时区时为UTC时间）整除周期长度
+            origin = index[:1].normalize().values.astype('datetime64[ns]').astype(np.int64)[0]
+            timestamps = index.values.astype('datetime64[ns]').astype(np.int64)
+            buckets = (timestamps - origin) // width.value
+        
+        # 相邻值变化处即为新K线的起点
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        
+        if daily:
+            labels = index[starts].normalize()
+        else:
+            labels = pd.DatetimeIndex(origin + buckets[starts] * width.value)
+            if index.tz is not None:
+                labels = labels.tz_localize('UTC').tz_convert(index.tz)
+        labels.name = index.name
+        
+        return pd.DataFrame({
+            'open': df['open'].to_numpy()[starts],
+            'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+            'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+            'close': df['close'].to_numpy()[ends],
+            'volume': np.add.reduceat(df['volume'].to_numpy(), starts),
+        }, index=labels)
+    
     @staticmethod
     def resample_monthly(df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -36,13 +106,116 @@ class DataProcessor:
         Returns:
             按月重采样后的数据框
         """
-        # 按月重采样并聚合数据
-        monthly_df = df.resample('ME').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        })
+        return DataProcessor.resample(df, 'ME')
+    
+    @staticmethod
+    def calculate_adjustment_factors(df: pd.DataFrame, actions: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        根据公司行为计算每个交易日的累计复权因子
+        
+        某个交易日的因子等于其之后所有除权除息事件因子的乘积：
+        拆股比例为s时因子为1/s，每股分红为D时因子为 1 - D/前一交易日收盘价。
+        
+        Args:
+            df: 股票数据DataFrame，日期为索引，包含close列
+            actions: 公司行为DataFrame，日期（除权除息日）为索引，包含dividend和split列
+            
+        Returns:
+            (价格复权因子数组, 拆股累计比例数组)
+        """
+        n = len(df)
+        # 位置k上的事件影响第k个交易日之前的所有数据，多出的一位对应最后一个交易日之后的事件
+        price_events = np.ones(n + 1)
+        split_events = np.ones(n + 1)
+        
+        if actions is not None and len(actions) > 0:
+            positions = df.index.searchsorted(actions.index)
+            # 第一个交易日之前的事件不影响任何数据
+            mask = positions > 0
+            positions = positions[mask]
+            splits = actions['split'].to_numpy(dtype=float)[mask]
+            dividends = actions['dividend'].to_numpy(dtype=float)[mask]
+            
+            splits = np.where(splits > 0, splits, 1.0)
+            prev_close = df['close'].to_numpy(dtype=float)[positions - 1]
+            
+            np.multiply.at(split_events, positions, splits)
+            np.multiply.at(price_events, positions, (1 - dividends / prev_close) / splits)
+        
+        # 反向累乘，得到每个交易日之后所有事件的因子乘积
+        price_factor = np.cumprod(price_events[::-1])[::-1][1:]
+        split_factor = np.cumprod(split_events[::-1])[::-1][1:]
+        
+        return price_factor, split_factor
+    
+    @staticmethod
+    def adjust_prices(df: pd.DataFrame, actions: pd.DataFrame) -> pd.DataFrame:
+        """
+        将原始价格转换为后向复权价格（最新价格不变，历史价格按公司行为缩放）
+        
+        Args:
+            df: 原始OHLCV数据，日期为索引
+            actions: 公司行为DataFrame，日期为索引，包含dividend和split列
+            
+        Returns:
+            复权后的DataFrame
+        """
+        price_factor, split_factor = DataProcessor.calculate_adjustment_factors(df, actions)
+        
+        df = df.copy()
+        price_columns = ['open', 'high', 'low', 'close']
+        df[price_columns] = df[price_columns].to_numpy() * price_factor[:, None]
+        df['volume'] = df['volume'].to_numpy() * split_factor
+        
+        return df
+    
+    @staticmethod
+    def unadjust_history(df: pd.DataFrame, intraday: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        将Yahoo Finance返回的历史数据拆分为原始OHLCV和公司行为
+        
+        Yahoo Finance（auto_adjust=False）返回的价格、成交量和分红已按获取时
+        为止的拆股调整过，这里按同一批数据中的拆股记录还原为原始值，
+        以便之后出现新的拆股时无需重新下载。
+        
+        Args:
+            df: yf.Ticker.history(auto_adjust=False, actions=True) 返回的DataFrame
+            intraday: 是否为日内数据，为True时保留K线时间，公司行为仍按日期返回
+            
+        Returns:
+            (原始OHLCV数据, 公司行为数据)，均以不带时区的交易所当地时间为索引
+        """
+        df = df.copy()
+        df.columns = df.columns.str.lower()
+        
+        # 统一为不带时区的索引，日线只保留日期
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        df.index = index if intraday else index.normalize()
+        df.index.name = 'date'
+        
+        actions = pd.DataFrame({
+            'dividend': df['dividends'] if 'dividends' in df.columns else 0.0,
+            'split': df['stock splits'] if 'stock splits' in df.columns else 0.0,
+        }, index=df.index)
+        actions = actions[(actions['dividend'] != 0) | (actions['split'] != 0)]
+        if intraday:
+            # 日内数据的公司行为记在除权除息日的K线上，按日期合并，作用于当天第一根K线之前的数据
+            actions = actions.groupby(actions.index.normalize()).max()
+            actions.index.name = 'date'
+        
+        prices = df[['open', 'high', 'low', 'close', 'volume']].dropna()
+        _, split_factor = DataProcessor.calculate_adjustment_factors(prices, actions)
+        
+        price_columns = ['open', 'high', 'low', 'close']
+        prices[price_columns] = prices[price_columns].to_numpy() * split_factor[:, None]
+        prices['volume'] = prices['volume'].to_numpy() / split_factor
+        
+        # 分红同样还原为除息日当时的每股金额
+        if len(actions) > 0 and len(prices) > 0:
+            positions = prices.index.searchsorted(actions.index).clip(max=len(prices) - 1)
+            actions = actions.copy()
+            actions['dividend'] = actions['dividend'].to_numpy() * split_factor[positions]
         
-        return monthly_df 
\ No newline at end of file
+        return prices, actions
@@ -1,9 +1,13 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 class DatabaseManager:
+    # 日内K线二进制数组中各列的顺序
+    INTRADAY_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+    
     def __init__(self, db_path: str = "stock_data.db"):
         """
         初始化数据库管理器
@@ -19,7 +23,13 @@ class DatabaseManager:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
-            # 创建股票数据表
+            # 早期版本用 to_sql(if_exists='replace') 写入，表结构没有主键且日期格式不一致，
+            # 这类旧表无法增量更新，直接删除后重新获取
+            columns = cursor.execute("PRAGMA table_info(stock_data)").fetchall()
+            if columns and not any(column[5] for column in columns):
+                cursor.execute("DROP TABLE stock_data")
+            
+            # 创建股票数据表（原始未复权价格）
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS stock_data (
                     date TEXT,
@@ -34,6 +44,61 @@ class DatabaseManager:
                 )
             ''')
             
+            # 按股票读取时使用的索引
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_stock_data_code_date
+                ON stock_data (stock_code, date)
+            ''')
+            
+            # 早期版本的日内K线表每根K线一行，读写大量分钟数据过慢，直接删除后重新获取
+            columns = cursor.execute("PRAGMA table_info(intraday_bars)").fetchall()
+            if columns and 'ohlcv' not in [column[1] for column in columns]:
+                cursor.execute("DROP TABLE intraday_bars")
+            
+            # 创建分钟/小时K线表，每个股票、周期和交易日一行：
+            # ts 为 int64 时间戳数组，ohlcv 为按行排列的 float64 OHLCV 数组，均以二进制存储
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS intraday_bars (
+                    stock_code TEXT,
+                    interval TEXT,
+                    day INTEGER,
+                    n_bars INTEGER,
+                    last_ts INTEGER,
+                    ts BLOB,
+                    ohlcv BLOB,
+                    PRIMARY KEY (stock_code, interval, day)
+                ) WITHOUT ROWID
+            ''')
+            
+            # 创建公司行为表（分红、拆股）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS corporate_actions (
+                    date TEXT,
+                    stock_code TEXT,
+                    dividend REAL,
+                    split REAL,
+                    PRIMARY KEY (date, stock_code)
+                )
+            ''')
+            
+            # 创建数据版本表，日线数据或公司行为变化时递增，用于判断分析结果缓存是否失效；
+            # 日内数据的版本以 "股票代码@周期" 为键
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    stock_code TEXT PRIMARY KEY,
+                    version INTEGER
+                )
+            ''')
+            
+            # 创建数据同步记录表，记录每个版本键最近一次成功请求Yahoo Finance的时间（交易所当地时间），
+            # 节假日等请求没有返回新K线时，据此避免在下一个交易日收盘前重复请求
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_log (
+                    stock_code TEXT PRIMARY KEY,
+                    checked_time TEXT
+                )
+            ''')
+            
             # 创建投资组合表
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS portfolios (
@@ -59,24 +124,97 @@ class DatabaseManager:
     
     def save_stock_data(self, stock_code: str, df: pd.DataFrame):
         """
-        保存股票数据到数据库
+        保存股票原始数据到数据库，已存在的交易日会被覆盖，数据有变化时更新数据版本号
         
         Args:
             stock_code: 股票代码
-            df: 股票数据DataFrame
+            df: 原始OHLCV数据DataFrame，日期为索引，列名为小写
         """
+        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = zip(
+            df.index.strftime('%Y-%m-%d'),
+            [stock_code] * len(df),
+            df['open'], df['high'], df['low'], df['close'], df['volume'],
+            [update_time] * len(df)
+        )
+        
         with sqlite3.connect(self.db_path) as conn:
-            # 准备数据
-            df = df.reset_index()
-            df['stock_code'] = stock_code
-            df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            changes_before = conn.total_changes
+            # 只有价格或成交量变化时才覆盖已有记录
+            conn.executemany('''
+                INSERT INTO stock_data
+                (date, stock_code, open, high, low, close, volume, update_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (date, stock_code) DO UPDATE SET
+                    open = excluded.open, high = excluded.high, low = excluded.low,
+                    close = excluded.close, volume = excluded.volume,
+                    update_time = excluded.update_time
+                WHERE open IS NOT excluded.open OR high IS NOT excluded.high
+                    OR low IS NOT excluded.low OR close IS NOT excluded.close
+                    OR volume IS NOT excluded.volume
+            ''', rows)
+            if conn.total_changes > changes_before:
+                self._bump_data_version(conn, stock_code)
+            conn.commit()
+    
+    def save_corporate_actions(self, stock_code: str, actions: pd.DataFrame):
+        """
+        保存公司行为到数据库，已存在的记录会被覆盖，数据有变化时更新数据版本号
+        
+        Args:
+            stock_code: 股票代码
+            actions: 公司行为DataFrame，除权除息日为索引，包含dividend和split列
+        """
+        rows = zip(
+            actions.index.strftime('%Y-%m-%d'),
+            [stock_code] * len(actions),
+            actions['dividend'], actions['split']
+        )
+        
+        with sqlite3.connect(self.db_path) as conn:
+            changes_before = conn.total_changes
+            conn.executemany('''
+                INSERT INTO corporate_actions (date, stock_code, dividend, split)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (date, stock_code) DO UPDATE SET
+                    dividend = excluded.dividend, split = excluded.split
+                WHERE dividend IS NOT excluded.dividend OR split IS NOT excluded.split
+            ''', rows)
+            if conn.total_changes > changes_before:
+                self._bump_data_version(conn, stock_code)
+            conn.commit()
+    
+    @staticmethod
+    def _bump_data_version(conn: sqlite3.Connection, stock_code: str):
+        """将股票的数据版本号加1"""
+        conn.execute('''
+            INSERT INTO data_versions (stock_code, version) VALUES (?, 1)
+            ON CONFLICT (stock_code) DO UPDATE SET version = version + 1
+        ''', (stock_code,))
+    
+    def get_data_versions(self, stock_codes: List[str]) -> Dict[str, int]:
+        """
+        获取股票日线数据的版本号，每次写入新数据或公司行为时递增
+        
+        Args:
+            stock_codes: 股票代码列表
             
-            # 写入数据库
-            df.to_sql('stock_data', conn, if_exists='replace', index=False)
+        Returns:
+            字典 {股票代码: 版本号}，没有数据的股票版本号为0
+        """
+        placeholders = ','.join('?' * len(stock_codes))
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT stock_code, version FROM data_versions
+                WHERE stock_code IN ({placeholders})
+            ''', tuple(stock_codes))
+            versions = dict(cursor.fetchall())
+        return {code: versions.get(code, 0) for code in stock_codes}
     
     def get_stock_data(self, stock_code: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
         """
-        从数据库获取股票数据
+        从数据库获取股票原始（未复权）数据
         
         Args:
             stock_code: 股票代码
@@ -101,6 +239,278 @@ class DatabaseManager:
                 return df
         return None
     
+    def get_corporate_actions(self, stock_code: str) -> pd.DataFrame:
+        """
+        获取股票的全部公司行为
+        
+        Args:
+            stock_code: 股票代码
+            
+        Returns:
+            公司行为DataFrame，除权除息日为索引，包含dividend和split列
+        """
+        query = '''
+            SELECT date, dividend, split
+            FROM corporate_actions
+            WHERE stock_code = ?
+            ORDER BY date
+        '''
+        
+        with sqlite3.connect(self.db_path) as conn:
+            df = pd.read_sql_query(query, conn, params=(stock_code,))
+        df['date'] = pd.to_datetime(df['date'])
+        return df.set_index('date')
+    
+    def get_latest_date(self, stock_code: str) -> Optional[str]:
+        """
+        获取数据库中股票最新一个交易日
+        
+        Args:
+            stock_code: 股票代码
+            
+        Returns:
+            日期字符串（YYYY-MM-DD），如果没有数据则返回None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT MAX(date) FROM stock_data WHERE stock_code = ?
+            ''', (stock_code,))
+            return cursor.fetchone()[0]
+    
+    def save_sync_time(self, stock_code: str, checked_time: datetime):
+        """
+        记录最近一次成功请求Yahoo Finance的时间
+        
+        Args:
+            stock_code: 股票代码，日内数据为 intraday_version_key 返回的键
+            checked_time: 请求时间（交易所当地时间）
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                INSERT INTO sync_log (stock_code, checked_time) VALUES (?, ?)
+                ON CONFLICT (stock_code) DO UPDATE SET checked_time = excluded.checked_time
+            ''', (stock_code, checked_time.strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+    
+    def get_sync_time(self, stock_code: str) -> Optional[datetime]:
+        """
+        获取最近一次成功请求Yahoo Finance的时间
+        
+        Args:
+            stock_code: 股票代码，日内数据为 intraday_version_key 返回的键
+            
+        Returns:
+            请求时间（交易所当地时间），从未请求过则返回None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT checked_time FROM sync_log WHERE stock_code = ?
+            ''', (stock_code,))
+            row = cursor.fetchone()
+        return datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S') if row else None
+    
+    def get_stock_codes(self) -> List[str]:
+        """
+        获取数据库中所有股票代码
+        
+        Returns:
+            股票代码列表
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT DISTINCT stock_code FROM stock_data ORDER BY stock_code')
+            return [row[0] for row in cursor.fetchall()]
+    
+    def get_universe_data(self, stock_codes: List[str], start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        一次查询获取多只股票的原始数据
+        
+        Args:
+            stock_codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            
+        Returns:
+            DataFrame，包含stock_code列，按股票代码和日期排序，日期为索引
+        """
+        placeholders = ','.join('?' * len(stock_codes))
+        query = f'''
+            SELECT date, stock_code, open, high, low, close, volume
+            FROM stock_data
+            WHERE stock_code IN ({placeholders}) AND date BETWEEN ? AND ?
+            ORDER BY stock_code, date
+        '''
+        
+        with sqlite3.connect(self.db_path) as conn:
+            df = pd.read_sql_query(query, conn, params=(*stock_codes, start_date, end_date))
+        df['date'] = pd.to_datetime(df['date'])
+        return df.set_index('date')
+    
+    def get_universe_actions(self, stock_codes: List[str]) -> pd.DataFrame:
+        """
+        一次查询获取多只股票的公司行为
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            DataFrame，包含stock_code、dividend和split列，除权除息日为索引
+        """
+        placeholders = ','.join('?' * len(stock_codes))
+        query = f'''
+            SELECT date, stock_code, dividend, split
+            FROM corporate_actions
+            WHERE stock_code IN ({placeholders})
+            ORDER BY stock_code, date
+        '''
+        
+        with sqlite3.connect(self.db_path) as conn:
+            df = pd.read_sql_query(query, conn, params=tuple(stock_codes))
+        df['date'] = pd.to_datetime(df['date'])
+        return df.set_index('date')
+    
+    def save_intraday_data(self, stock_code: str, interval: str, df: pd.DataFrame):
+        """
+        保存日内K线数据到数据库，与已存储的同一交易日数据合并，相同时间的K线以新数据为准
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期，如 '1m'、'5m'、'1h'
+            df: OHLCV数据DataFrame，以交易所当地时间（不带时区）为索引，列名为小写
+        """
+        if len(df) == 0:
+            return
+        
+        # 当地时间按UTC编码为整数秒
+        ts = df.index.values.astype('datetime64[s]').astype(np.int64)
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        values = df[self.INTRADAY_COLUMNS].to_numpy(dtype=np.float64)[order]
+        
+        # 按交易日切分，交易日编码为 YYYYMMDD 整数
+        days = ts // 86400
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        ends = np.r_[starts[1:], len(ts)]
+        day_index = pd.DatetimeIndex(days[starts].astype('datetime64[D]'))
+        day_keys = (day_index.year * 10000 + day_index.month * 100 + day_index.day).tolist()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT day, ts, ohlcv FROM intraday_bars
+                WHERE stock_code = ? AND interval = ? AND day BETWEEN ? AND ?
+            ''', (stock_code, interval, day_keys[0], day_keys[-1]))
+            existing = {day: self._decode_intraday(ts_blob, ohlcv_blob)
+                        for day, ts_blob, ohlcv_blob in cursor.fetchall()}
+            
+            rows = []
+            for day, start, end in zip(day_keys, starts, ends):
+                day_ts, day_values = ts[start:end], values[start:end]
+                old = existing.get(day)
+                if old is not None:
+                    day_ts = np.concatenate([old[0], day_ts])
+                    day_values = np.concatenate([old[1], day_values])
+                
+                # 去除重复时间，保留最后出现（最新）的K线
+                last = len(day_ts) - 1 - np.unique(day_ts[::-1], return_index=True)[1]
+                day_ts, day_values = day_ts[last], day_values[last]
+                
+                if old is not None and np.array_equal(old[0], day_ts) and np.array_equal(old[1], day_values):
+                    continue
+                rows.append((
+                    stock_code, interval, day, len(day_ts), int(day_ts[-1]),
+                    day_ts.astype('<i8').tobytes(), day_values.astype('<f8').tobytes()
+                ))
+            
+            if rows:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO intraday_bars
+                    (stock_code, interval, day, n_bars, last_ts, ts, ohlcv)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self._bump_data_version(conn, self.intraday_version_key(stock_code, interval))
+            conn.commit()
+    
+    def get_intraday_data(self, stock_code: str, interval: str,
+                          start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        从数据库获取日内K线数据
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期
+            start_date: 开始日期（YYYY-MM-DD）
+            end_date: 结束日期（YYYY-MM-DD），包含当天
+            
+        Returns:
+            以交易所当地时间为索引的DataFrame，如果没有数据则返回None
+        """
+        query = '''
+            SELECT ts, ohlcv
+            FROM intraday_bars
+            WHERE stock_code = ? AND interval = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+        '''
+        start_day = int(start_date.replace('-', ''))
+        end_day = int(end_date.replace('-', ''))
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (stock_code, interval, start_day, end_day))
+            rows = cursor.fetchall()
+        
+        if not rows:
+            return None
+        
+        decoded = [self._decode_intraday(ts_blob, ohlcv_blob) for ts_blob, ohlcv_blob in rows]
+        ts = np.concatenate([day_ts for day_ts, _ in decoded])
+        values = np.concatenate([day_values for _, day_values in decoded])
+        
+        index = pd.DatetimeIndex(ts.astype('datetime64[s]').astype('datetime64[ns]'), name='date')
+        return pd.DataFrame(values, index=index, columns=self.INTRADAY_COLUMNS)
+    
+    def get_latest_intraday_time(self, stock_code: str, interval: str) -> Optional[datetime]:
+        """
+        获取数据库中日内K线的最新时间
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期
+            
+        Returns:
+            交易所当地时间，如果没有数据则返回None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT MAX(last_ts) FROM intraday_bars WHERE stock_code = ? AND interval = ?
+            ''', (stock_code, interval))
+            latest = cursor.fetchone()[0]
+        return pd.to_datetime(latest, unit='s').to_pydatetime() if latest is not None else None
+    
+    @staticmethod
+    def intraday_version_key(stock_code: str, interval: str) -> str:
+        """
+        日内数据在数据版本表中的键
+        
+        Args:
+            stock_code: 股票代码
+            interval: K线周期
+            
+        Returns:
+            形如 "AAPL@1h" 的键
+        """
+        return f"{stock_code}@{interval}"
+    
+    @classmethod
+    def _decode_intraday(cls, ts_blob: bytes, ohlcv_blob: bytes):
+        """将一个交易日的二进制数据解码为 (时间戳数组, OHLCV数组)"""
+        ts = np.frombuffer(ts_blob, dtype='<i8')
+        values = np.frombuffer(ohlcv_blob, dtype='<f8').reshape(-1, len(cls.INTRADAY_COLUMNS))
+        return ts, values
+    
     def save_portfolio(self, name: str, components: Dict[str, float], description: str = ""):
         """
         保存投资组合到数据库
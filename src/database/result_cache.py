@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from typing import Dict, Optional, Tuple
+
+class ResultCache:
+    # 分析结果的版本号，分析代码或结果格式变化时加1，使旧版本的缓存全部失效
+    RESULT_VERSION = 1
+    
+    def __init__(self, cache_dir: str = "cache", max_size_mb: float = 100):
+        """
+        初始化分析结果缓存
+
+        每条缓存包含一个结果文件（.pkl）和可选的图表文件（.png），
+        总大小超过上限时按最近访问时间淘汰最旧的缓存。
+
+        Args:
+            cache_dir: 缓存目录
+            max_size_mb: 缓存目录大小上限（MB）
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(portfolio: Dict[str, float],
+                 window: Tuple,
+                 data_versions: Dict[str, int],
+                 settings: Optional[Dict] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            portfolio: parse_portfolio_input 的输出 {股票代码: 占比}
+            window: 分析窗口，如 (K线周期, 截止日期)
+            data_versions: 每只股票的数据版本号
+            settings: 影响结果的分析参数，如蒙特卡洛模拟的路径数、期限、抽样方法和随机种子
+
+        Returns:
+            缓存键（十六进制字符串）
+        """
+        # 规范化：代码统一为大写并排序，权重去除浮点误差
+        canonical = {
+            'result_version': ResultCache.RESULT_VERSION,
+            'portfolio': sorted((code.strip().upper(), round(weight, 10)) for code, weight in portfolio.items()),
+            'window': list(window),
+            'versions': sorted(data_versions.items()),
+            'settings': sorted((settings or {}).items()),
+        }
+        return hashlib.sha256(json.dumps(canonical).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Dict, Optional[str]]]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (分析结果, 图表文件路径)，图表不存在时路径为None；未命中返回None
+        """
+        result_path = self._path(key, 'pkl')
+        try:
+            with open(result_path, 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        chart_path = self._path(key, 'png')
+        if not os.path.exists(chart_path):
+            chart_path = None
+
+        # 更新访问时间，供淘汰策略使用
+        for path in (result_path, chart_path):
+            if path:
+                os.utime(path)
+
+        return result, chart_path
+
+    def set(self, key: str, result: Dict, chart_path: Optional[str] = None) -> Optional[str]:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            result: 分析结果，需可被pickle序列化
+            chart_path: 已生成的图表文件，会被复制到缓存目录
+
+        Returns:
+            缓存中的图表文件路径，没有图表时返回None
+        """
+        # 先写临时文件再替换，避免中断时留下不完整的缓存
+        result_path = self._path(key, 'pkl')
+        temp_path = f"{result_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(temp_path, result_path)
+
+        cached_chart = None
+        if chart_path:
+            cached_chart = self._path(key, 'png')
+            shutil.copyfile(chart_path, cached_chart)
+
+        self._evict()
+        return cached_chart
+
+    def _path(self, key: str, extension: str) -> str:
+        """缓存文件路径"""
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def _evict(self):
+        """按最近访问时间淘汰缓存，同一缓存键的结果和图表一起删除，直到总大小不超过上限"""
+        entries = {}
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file():
+                stat = entry.stat()
+                key = entry.name.split('.', 1)[0]
+                access_time, size, paths = entries.get(key, (0, 0, []))
+                entries[key] = (max(access_time, stat.st_mtime), size + stat.st_size, paths + [entry.path])
+
+        total_size = sum(size for _, size, _ in entries.values())
+        for access_time, size, paths in sorted(entries.values()):
+            if total_size <= self.max_size:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
@@ -1,14 +1,40 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from src.data.data_fetcher import StockDataFetcher
+from src.data.data_processor import DataProcessor
 from src.analysis.calculator import ReturnCalculator
 from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+from src.analysis.monte_carlo import MonteCarloSimulator
+from src.analysis.optimizer import PortfolioOptimizer
 from src.visualization.chart_generator import ChartGenerator
+from src.database.result_cache import ResultCache
+from datetime import date
 import os
 
 class MainWindow:
+    # 优化目标名称与PortfolioOptimizer方法的对应关系
+    OPTIMIZE_METHODS = {
+        '最大夏普比率': 'max_sharpe',
+        '最小方差': 'min_variance',
+        '风险平价': 'risk_parity',
+    }
+    
+    # K线周期名称与周期代码的对应关系
+    INTERVALS = {
+        '日线（近10年）': '1d',
+        '小时线': '1h',
+        '30分钟线': '30m',
+        '15分钟线': '15m',
+        '5分钟线': '5m',
+        '1分钟线': '1m',
+    }
+    
+    # 进行蒙特卡洛模拟所需的最少日线数量
+    MIN_SIMULATION_DAYS = 20
+    
     def __init__(self):
         self.window = tk.Tk()
         self.window.title("股票投资组合分析系统")
@@ -18,7 +44,9 @@ class MainWindow:
         self.data_fetcher = StockDataFetcher()
         self.calculator = ReturnCalculator()
         self.portfolio_analyzer = PortfolioAnalyzer()
+        self.simulator = MonteCarloSimulator(seed=42)
         self.chart_generator = ChartGenerator()
+        self.result_cache = ResultCache()
         
         self._init_ui()
         
@@ -46,10 +74,26 @@ class MainWindow:
         self.portfolio_input = ttk.Entry(parent, width=30)
         self.portfolio_input.pack(pady=5)
         
+        # K线周期
+        ttk.Label(parent, text="K线周期").pack(anchor=tk.W)
+        self.interval_select = ttk.Combobox(parent, width=27, state='readonly',
+                                            values=list(self.INTERVALS))
+        self.interval_select.current(0)
+        self.interval_select.pack(pady=5)
+        
         # 分析按钮
         ttk.Button(parent, text="分析投资组合", 
                   command=self._analyze_portfolio).pack(pady=10)
         
+        # 权重优化
+        ttk.Label(parent, text="优化目标").pack(anchor=tk.W)
+        self.optimize_method = ttk.Combobox(parent, width=27, state='readonly',
+                                            values=list(self.OPTIMIZE_METHODS))
+        self.optimize_method.current(0)
+        self.optimize_method.pack(pady=5)
+        ttk.Button(parent, text="优化权重", 
+                  command=self._optimize_portfolio).pack(pady=10)
+        
         # 结果文本区域
         ttk.Label(parent, text="分析结果").pack(anchor=tk.W, pady=(10,0))
         self.result_text = tk.Text(parent, width=40, height=20)
@@ -73,48 +117,88 @@ class MainWindow:
             portfolio_str = self.portfolio_input.get().strip()
             portfolio = self.portfolio_analyzer.parse_portfolio_input(portfolio_str)
             
+            interval = self.INTERVALS[self.interval_select.get()]
+            
+            # 先把本地数据更新到最新，增量写入的新数据会改变数据版本号
+            self.data_fetcher.sync_data(list(portfolio), interval)
+            
+            # 分析窗口为截至今天的K线周期和数据范围，数据版本号变化时缓存自动失效
+            window = (interval, date.today().isoformat())
+            cache_key = self.result_cache.make_key(
+                portfolio, window, self.data_fetcher.get_data_versions(list(portfolio), interval),
+                self.simulator.settings
+            )
+            cached = self.result_cache.get(cache_key)
+            
+            if cached is not None and cached[1] is not None:
+                # 直接显示缓存的结果和图表
+                result, chart_path = cached
+                self.result_text.insert(tk.END, "使用缓存的分析结果（数据未更新）\n")
+                self.result_text.insert(tk.END, self._format_result(result))
+                self.ax.imshow(plt.imread(chart_path))
+                self.ax.axis('off')
+                self.canvas.draw()
+                return
+            
             # 存储分析结果
             stock_data = {}
+            stocks = {}
             returns = {}
-            volatilities = {}
-            drawdowns = {}
             
             # 分析每只股票
             for stock_code in portfolio:
-                self.result_text.insert(tk.END, f"\n分析股票 {stock_code}...\n")
+                self.result_text.insert(tk.END, f"分析股票 {stock_code}...\n")
                 self.result_text.see(tk.END)
                 
                 # 获取数据
-                df = self.data_fetcher.fetch_stock_data(stock_code)
+                if interval == '1d':
+                    df = self.data_fetcher.fetch_stock_data(stock_code)
+                else:
+                    df = self.data_fetcher.fetch_intraday_data(stock_code, interval)
                 df = df.copy()  # 创建副本以避免修改原始数据
                 stock_data[stock_code] = df
                 
                 # 计算指标
                 total_return, annual_return = self.calculator.calculate_returns(df)
                 returns[stock_code] = total_return
-                volatilities[stock_code] = self.portfolio_analyzer.calculate_volatility(df)
-                drawdowns[stock_code] = self.portfolio_analyzer.calculate_max_drawdown(df)
-                
-                # 显示结果
-                self.result_text.insert(tk.END, 
-                    f"总回报率: {total_return:.2%}\n"
-                    f"年化回报率: {annual_return:.2%}\n"
-                    f"年化波动率: {volatilities[stock_code]:.2%}\n"
-                    f"最大回撤: {drawdowns[stock_code]:.2%}\n"
-                )
-            
-            # 计算组合回报率
+                stocks[stock_code] = {
+                    'total_return': total_return,
+                    'annual_return': annual_return,
+                    'volatility': self.portfolio_analyzer.calculate_volatility(df),
+                    'max_drawdown': self.portfolio_analyzer.calculate_max_drawdown(df),
+                }
+            
+            # 计算组合回报率，年数按数据频率折算
             portfolio_return = self.portfolio_analyzer.calculate_portfolio_return(
                 returns, portfolio
             )
-            
-            # 显示组合结果
-            self.result_text.insert(tk.END, 
-                f"\n投资组合整体分析结果:\n"
-                f"总回报率: {portfolio_return:.2%}\n"
-                f"年化回报率: {((1 + portfolio_return) ** (1/10) - 1):.2%}\n"
+            years = max(
+                len(df) / self.calculator.infer_periods_per_year(df.index)
+                for df in stock_data.values()
             )
             
+            # 蒙特卡洛模拟按日收益率抽样，日内数据先合成为日线，日线太少时跳过
+            daily_data = stock_data
+            if interval != '1d':
+                daily_data = {
+                    stock_code: DataProcessor.resample(df, '1D')
+                    for stock_code, df in stock_data.items()
+                }
+            simulation = None
+            if min(len(df) for df in daily_data.values()) >= self.MIN_SIMULATION_DAYS:
+                simulation = self.simulator.simulate(daily_data, portfolio)
+            
+            result = {
+                'stocks': stocks,
+                'portfolio_return': portfolio_return,
+                'years': years,
+                'simulation': simulation,
+            }
+            
+            # 显示结果
+            self.result_text.delete(1.0, tk.END)
+            self.result_text.insert(tk.END, self._format_result(result))
+            
             # 绘制图表
             self.chart_generator.generate_portfolio_chart(
                 stock_data=stock_data,
@@ -123,6 +207,105 @@ class MainWindow:
             )
             self.canvas.draw()
             
+            # 保存图表并缓存结果
+            save_path = "charts/portfolio_chart.png"
+            os.makedirs("charts", exist_ok=True)
+            self.fig.savefig(save_path, bbox_inches='tight')
+            self.result_cache.set(cache_key, result, save_path)
+            
+        except Exception as e:
+            messagebox.showerror("错误", str(e))
+    
+    @staticmethod
+    def _format_result(result: dict) -> str:
+        """
+        将分析结果格式化为显示文本
+        
+        Args:
+            result: 分析结果字典
+            
+        Returns:
+            显示文本
+        """
+        lines = []
+        for stock_code, metrics in result['stocks'].items():
+            lines.append(
+                f"\n股票 {stock_code}:\n"
+                f"总回报率: {metrics['total_return']:.2%}\n"
+                f"年化回报率: {metrics['annual_return']:.2%}\n"
+                f"年化波动率: {metrics['volatility']:.2%}\n"
+                f"最大回撤: {metrics['max_drawdown']:.2%}\n"
+            )
+        
+        portfolio_return = result['portfolio_return']
+        lines.append(
+            f"\n投资组合整体分析结果:\n"
+            f"总回报率: {portfolio_return:.2%}\n"
+            f"年化回报率: {((1 + portfolio_return) ** (1 / result['years']) - 1):.2%}\n"
+        )
+        
+        simulation = result['simulation']
+        if simulation is None:
+            lines.append("\n日线数据不足，跳过蒙特卡洛模拟\n")
+            return ''.join(lines)
+        lines.append(
+            f"\n蒙特卡洛模拟（未来{simulation['horizon']}个交易日）:\n"
+            f"回报率中位数: {simulation['terminal_return']['p50']:.2%}\n"
+            f"亏损概率: {simulation['prob_loss']:.2%}\n"
+            f"95% VaR: {simulation['var'][0.95]:.2%}\n"
+            f"95% CVaR: {simulation['cvar'][0.95]:.2%}\n"
+            f"最大回撤中位数: {simulation['max_drawdown']['p50']:.2%}\n"
+        )
+        return ''.join(lines)
+    
+    def _optimize_portfolio(self):
+        """优化输入股票的权重，并绘制有效前沿"""
+        try:
+            # 清空之前的结果
+            self.result_text.delete(1.0, tk.END)
+            self.ax.clear()
+            
+            # 只使用输入中的股票代码，权重由优化器决定
+            portfolio_str = self.portfolio_input.get().strip()
+            portfolio = self.portfolio_analyzer.parse_portfolio_input(portfolio_str)
+            
+            stock_data = {}
+            for stock_code in portfolio:
+                df = self.data_fetcher.fetch_stock_data(stock_code).copy()
+                df.columns = df.columns.str.lower()
+                stock_data[stock_code] = df
+            
+            # 计算最优权重和有效前沿
+            optimizer = PortfolioOptimizer.from_stock_data(stock_data)
+            method_name = self.optimize_method.get()
+            weights = getattr(optimizer, self.OPTIMIZE_METHODS[method_name])()
+            frontier = optimizer.efficient_frontier()
+            annual_return, volatility, sharpe = optimizer.portfolio_performance(
+                np.array(list(weights.values()))
+            )
+            
+            # 将优化后的权重填回输入框
+            self.portfolio_input.delete(0, tk.END)
+            self.portfolio_input.insert(0, ','.join(f"{code}:{w:.4f}" for code, w in weights.items()))
+            
+            # 显示结果
+            self.result_text.insert(tk.END, f"{method_name}组合权重:\n")
+            for stock_code, weight in weights.items():
+                self.result_text.insert(tk.END, f"{stock_code}: {weight:.2%}\n")
+            self.result_text.insert(tk.END, 
+                f"\n预期年化收益率: {annual_return:.2%}\n"
+                f"预期年化波动率: {volatility:.2%}\n"
+                f"夏普比率: {sharpe:.2f}\n"
+            )
+            
+            # 绘制有效前沿
+            self.chart_generator.generate_efficient_frontier_chart(
+                frontier=frontier,
+                highlight={method_name: (volatility, annual_return)},
+                ax=self.ax
+            )
+            self.canvas.draw()
+            
         except Exception as e:
             messagebox.showerror("错误", str(e))
     
@@ -115,4 +115,44 @@ class ChartGenerator:
                 plt.close()
             
         except Exception as e:
-            raise Exception(f"生成投资组合走势图失败: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"生成投资组合走势图失败: {str(e)}")
+
+    def generate_efficient_frontier_chart(self,
+                                        frontier: pd.DataFrame,
+                                        highlight: Dict[str, tuple] = None,
+                                        save_path: str = None,
+                                        ax = None):
+        """
+        生成有效前沿图
+        
+        Args:
+            frontier: 有效前沿DataFrame，包含return和volatility列
+            highlight: 字典，键为标注名称，值为(年化波动率, 年化收益率)
+            save_path: 图表保存路径
+            ax: matplotlib的Axes对象，如果提供则在其上绘图
+        """
+        try:
+            if ax is None:
+                fig, ax = plt.subplots(figsize=(12, 6))
+            
+            # 收益率区间退化时前沿只有一个点，需要标记才能显示
+            ax.plot(frontier['volatility'], frontier['return'], label='有效前沿',
+                    marker='o' if len(frontier) == 1 else None)
+            
+            # 标注特定组合
+            for name, (volatility, annual_return) in (highlight or {}).items():
+                ax.scatter(volatility, annual_return, marker='*', s=150, label=name, zorder=3)
+            
+            # 设置图表属性
+            ax.set_title('有效前沿', fontsize=12)
+            ax.set_xlabel('年化波动率')
+            ax.set_ylabel('年化收益率')
+            ax.grid(True)
+            ax.legend()
+            
+            if save_path:
+                plt.savefig(save_path, bbox_inches='tight')
+                plt.close()
+            
+        except Exception as e:
+            raise Exception(f"生成有效前沿图失败: {str(e)}")
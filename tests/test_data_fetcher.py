@@ -0,0 +1,86 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+from src.data.data_fetcher import StockDataFetcher
+
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return StockDataFetcher()
+
+
+@pytest.mark.parametrize('now, expected', [
+    # 周五收盘前为周四，收盘后为周五，周末和下周一收盘前仍为周五
+    ('2024-03-08 15:00', '2024-03-07 16:00'),
+    ('2024-03-08 16:45', '2024-03-08 16:00'),
+    ('2024-03-09 12:00', '2024-03-08 16:00'),
+    ('2024-03-11 09:00', '2024-03-08 16:00'),
+])
+def test_last_session_close(fetcher, now, expected):
+    now = pd.Timestamp(now, tz='America/New_York')
+
+    assert fetcher._last_session_close('AAPL', now) == datetime.fromisoformat(expected)
+
+
+def test_last_session_close_uses_exchange_time_zone(fetcher):
+    # 北京时间周六早上6点，纽约仍为周五17点，已收盘
+    now = pd.Timestamp('2024-03-09 06:00', tz='Asia/Shanghai')
+
+    assert fetcher._last_session_close('AAPL', now) == datetime(2024, 3, 8, 16)
+    assert fetcher._last_session_close('600000.SS', now) == datetime(2024, 3, 8, 15)
+
+
+def test_empty_top_up_is_not_retried_until_next_session(fetcher, monkeypatch):
+    prices = pd.DataFrame({column: [1.0] for column in ['open', 'high', 'low', 'close', 'volume']},
+                          index=pd.DatetimeIndex(['2024-03-07']))
+    fetcher.db_manager.save_stock_data('AAPL', prices)
+
+    # 周五为节假日，收盘后请求没有返回新K线
+    calls = []
+    monkeypatch.setattr(fetcher, '_download_history', lambda *args: calls.append(args) or False)
+    monkeypatch.setattr(fetcher, '_exchange_now', lambda code: datetime(2024, 3, 8, 17))
+    monkeypatch.setattr(fetcher, '_last_session_close', lambda code: datetime(2024, 3, 8, 16))
+
+    fetcher.sync_stock_data('AAPL')
+    fetcher.sync_stock_data('AAPL')
+    assert len(calls) == 1
+
+    # 下一个交易日收盘后重新请求
+    monkeypatch.setattr(fetcher, '_last_session_close', lambda code: datetime(2024, 3, 11, 16))
+    fetcher.sync_stock_data('AAPL')
+    assert len(calls) == 2
+
+
+def test_intraday_sync_uses_last_completed_session(fetcher, monkeypatch):
+    # 纽约时间周五 9:30 ~ 15:30 的小时线
+    index = pd.date_range('2024-03-08 09:30', '2024-03-08 15:30', freq='1h')
+    bars = pd.DataFrame({column: 1.0 for column in ['open', 'high', 'low', 'close', 'volume']}, index=index)
+    fetcher.db_manager.save_intraday_data('AAPL', '1h', bars)
+
+    requests = []
+
+    class Ticker:
+        def __init__(self, code):
+            pass
+
+        def history(self, **kwargs):
+            requests.append(kwargs)
+            return pd.DataFrame()
+
+    monkeypatch.setattr('src.data.data_fetcher.yf.Ticker', Ticker, raising=False)
+    monkeypatch.setattr(fetcher, '_exchange_now', lambda code: datetime(2024, 3, 11, 17))
+
+    # 周末和下周一收盘前本地数据已是最新
+    monkeypatch.setattr(fetcher, '_last_session_close', lambda code: datetime(2024, 3, 8, 16))
+    fetcher.sync_intraday_data('AAPL', '1h')
+    assert requests == []
+
+    # 周一收盘后请求一次，没有新K线（如节假日）时不再重复请求
+    monkeypatch.setattr(fetcher, '_last_session_close', lambda code: datetime(2024, 3, 11, 16))
+    fetcher.sync_intraday_data('AAPL', '1h')
+    fetcher.sync_intraday_data('AAPL', '1h')
+    assert len(requests) == 1
+    assert requests[0]['end'] == datetime(2024, 3, 12)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from src.data.data_processor import DataProcessor
+from src.database.db_manager import DatabaseManager
+
+# 原始（未复权）价格：第3个交易日1拆2，第5个交易日每股分红1元
+RAW_CLOSE = np.array([100.0, 102.0, 51.0, 52.0, 51.0, 53.0])
+RAW_VOLUME = np.array([10.0, 10.0, 20.0, 20.0, 20.0, 20.0])
+DATES = pd.bdate_range('2024-01-01', periods=6)
+
+
+def _raw_frame(n=len(DATES)):
+    """构造原始OHLCV数据"""
+    close = RAW_CLOSE[:n]
+    return pd.DataFrame({
+        'open': close, 'high': close, 'low': close, 'close': close, 'volume': RAW_VOLUME[:n],
+    }, index=DATES[:n])
+
+
+def _actions(split_day=2, dividend_day=4):
+    """构造公司行为数据"""
+    return pd.DataFrame({
+        'dividend': [0.0, 1.0],
+        'split': [2.0, 0.0],
+    }, index=DATES[[split_day, dividend_day]])
+
+
+def _yahoo_history(n):
+    """
+    模拟在第n个交易日获取的 yf.Ticker.history(auto_adjust=False, actions=True)：
+    价格、成交量和分红已按获取时已发生的拆股调整
+    """
+    raw = _raw_frame(n)
+    split_factor = np.where(np.arange(n) < 2, 2.0, 1.0) if n > 2 else np.ones(n)
+    history = pd.DataFrame({
+        'Open': raw['open'].to_numpy() / split_factor,
+        'High': raw['high'].to_numpy() / split_factor,
+        'Low': raw['low'].to_numpy() / split_factor,
+        'Close': raw['close'].to_numpy() / split_factor,
+        'Volume': raw['volume'].to_numpy() * split_factor,
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=DATES[:n].tz_localize('America/New_York'))
+    if n > 2:
+        history.iloc[2, history.columns.get_loc('Stock Splits')] = 2.0
+    if n > 4:
+        history.iloc[4, history.columns.get_loc('Dividends')] = 1.0
+    return history
+
+
+def _expected_adjusted_close():
+    """手工计算的复权收盘价"""
+    dividend_factor = 1 - 1.0 / RAW_CLOSE[3]
+    factor = np.array([dividend_factor / 2, dividend_factor / 2,
+                       dividend_factor, dividend_factor, 1.0, 1.0])
+    return RAW_CLOSE * factor
+
+
+def test_adjust_prices_with_split_and_dividend():
+    adjusted = DataProcessor.adjust_prices(_raw_frame(), _actions())
+
+    np.testing.assert_allclose(adjusted['close'], _expected_adjusted_close())
+    np.testing.assert_allclose(adjusted['volume'], [20, 20, 20, 20, 20, 20])
+
+
+def test_event_after_last_bar_adjusts_whole_history():
+    actions = pd.DataFrame({'dividend': [0.0], 'split': [5.0]},
+                           index=pd.DatetimeIndex(['2024-02-01']))
+
+    adjusted = DataProcessor.adjust_prices(_raw_frame(), actions)
+
+    np.testing.assert_allclose(adjusted['close'], RAW_CLOSE / 5)
+
+
+def test_unadjust_then_adjust_round_trip():
+    prices, actions = DataProcessor.unadjust_history(_yahoo_history(len(DATES)))
+
+    np.testing.assert_allclose(prices['close'], RAW_CLOSE)
+    np.testing.assert_allclose(prices['volume'], RAW_VOLUME)
+    np.testing.assert_allclose(actions['split'], [2.0, 0.0])
+    np.testing.assert_allclose(actions['dividend'], [0.0, 1.0])
+
+    adjusted = DataProcessor.adjust_prices(prices, actions)
+    np.testing.assert_allclose(adjusted['close'], _expected_adjusted_close())
+
+
+def test_new_split_in_incremental_batch(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "stock_data.db"))
+
+    # 拆股前获取前两个交易日
+    prices, actions = DataProcessor.unadjust_history(_yahoo_history(2))
+    db_manager.save_stock_data('TEST', prices)
+    db_manager.save_corporate_actions('TEST', actions)
+
+    # 拆股后从最新交易日开始增量获取，重叠的交易日已按新拆股调整
+    prices, actions = DataProcessor.unadjust_history(_yahoo_history(len(DATES)).iloc[1:])
+    db_manager.save_stock_data('TEST', prices)
+    db_manager.save_corporate_actions('TEST', actions)
+
+    raw = db_manager.get_stock_data('TEST', '2024-01-01', '2024-12-31')
+    adjusted = DataProcessor.adjust_prices(raw, db_manager.get_corporate_actions('TEST'))
+
+    np.testing.assert_allclose(raw['close'], RAW_CLOSE)
+    np.testing.assert_allclose(adjusted['close'], _expected_adjusted_close())
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analysis.calculator import ReturnCalculator
+from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+from src.data.data_processor import DataProcessor
+from src.database.db_manager import DatabaseManager
+
+AGGREGATIONS = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def _minute_bars(start, periods, tz=None):
+    """构造交易时段内的分钟K线"""
+    index = pd.date_range(start, periods=periods, freq='1min', tz=tz)
+    index = index[(index.hour >= 9) & (index.hour < 15)]
+    close = np.random.default_rng(0).random(len(index)) + 10
+    return pd.DataFrame({
+        'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+        'volume': np.arange(len(index), dtype=float),
+    }, index=index)
+
+
+@pytest.mark.parametrize('tz', [None, 'Asia/Shanghai', 'Asia/Kolkata', 'America/New_York'])
+@pytest.mark.parametrize('rule', ['5min', '1h', '1D'])
+def test_resample_matches_pandas(tz, rule):
+    # 纽约时区的数据跨越夏令时切换
+    df = _minute_bars('2024-03-07 09:15', 60 * 24 * 6, tz)
+
+    result = DataProcessor.resample(df, rule)
+    expected = df.resample(rule).agg(AGGREGATIONS).dropna()
+
+    assert result.index.equals(expected.index)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('tz', [None, 'Asia/Kolkata', 'America/New_York'])
+@pytest.mark.parametrize('rule', ['7min', '25min', '1h'])
+def test_resample_matches_pandas_around_the_clock(tz, rule):
+    # 全天24小时的分钟数据，纽约时区跨越夏令时结束（01:00重复一次），周期不整除一天
+    index = pd.date_range('2024-11-02 09:13', '2024-11-04 03:00', freq='1min', tz=tz)
+    close = np.random.default_rng(1).random(len(index)) + 10
+    df = pd.DataFrame({
+        'open': close, 'high': close + 0.1, 'low': close - 0.1, 'close': close,
+        'volume': np.arange(len(index), dtype=float),
+    }, index=index)
+
+    result = DataProcessor.resample(df, rule)
+    expected = df.resample(rule).agg(AGGREGATIONS).dropna()
+
+    assert result.index.equals(expected.index)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+
+
+def test_intraday_store_round_trip_and_merge(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "stock_data.db"))
+    df = _minute_bars('2024-03-04 09:00', 60 * 24 * 3)
+
+    db_manager.save_intraday_data('TEST', '1m', df.iloc[:-100])
+    version = db_manager.get_data_versions(['TEST@1m'])['TEST@1m']
+
+    # 增量数据与已有数据重叠，重叠部分以新数据为准
+    top_up = df.iloc[-150:].copy()
+    top_up['close'] += 1
+    db_manager.save_intraday_data('TEST', '1m', top_up)
+
+    loaded = db_manager.get_intraday_data('TEST', '1m', '2024-03-01', '2024-03-31')
+    expected = pd.concat([df.iloc[:-150], top_up])
+    assert loaded.index.equals(expected.index.rename('date'))
+    np.testing.assert_allclose(loaded.to_numpy(), expected.to_numpy())
+    assert db_manager.get_latest_intraday_time('TEST', '1m') == df.index[-1]
+    assert db_manager.get_data_versions(['TEST@1m'])['TEST@1m'] == version + 1
+
+    # 重复写入相同数据不改变版本号
+    db_manager.save_intraday_data('TEST', '1m', top_up)
+    assert db_manager.get_data_versions(['TEST@1m'])['TEST@1m'] == version + 1
+
+
+def _yahoo_hourly(days, adjusted_for_split):
+    """
+    模拟 yf.Ticker.history(interval='1h', auto_adjust=False, actions=True)：
+    第2个交易日1拆2，拆股后获取的数据已按拆股调整
+    """
+    index = pd.DatetimeIndex([f"{day} {hour}:30" for day in days for hour in (9, 10, 11, 12)],
+                             tz='America/New_York')
+    raw_close = np.where(index.normalize() < pd.Timestamp('2024-03-05', tz='America/New_York'), 100.0, 50.0)
+    factor = np.where(raw_close == 100.0, 2.0, 1.0) if adjusted_for_split else np.ones(len(index))
+    history = pd.DataFrame({
+        'Open': raw_close / factor, 'High': raw_close / factor, 'Low': raw_close / factor,
+        'Close': raw_close / factor, 'Volume': np.where(raw_close == 100.0, 10.0, 20.0) * factor, 'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+    history.loc[history.index == pd.Timestamp('2024-03-05 09:30', tz='America/New_York'), 'Stock Splits'] = 2.0
+    return history
+
+
+def test_intraday_split_in_top_up_batch(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "stock_data.db"))
+
+    # 拆股前获取第一个交易日
+    prices, actions = DataProcessor.unadjust_history(_yahoo_hourly(['2024-03-04'], False), intraday=True)
+    db_manager.save_intraday_data('TEST', '1h', prices)
+    db_manager.save_corporate_actions('TEST', actions)
+
+    # 拆股后增量获取，重叠的第一个交易日已按新拆股调整
+    history = _yahoo_hourly(['2024-03-04', '2024-03-05', '2024-03-06'], True).iloc[3:]
+    prices, actions = DataProcessor.unadjust_history(history, intraday=True)
+    db_manager.save_intraday_data('TEST', '1h', prices)
+    db_manager.save_corporate_actions('TEST', actions)
+
+    raw = db_manager.get_intraday_data('TEST', '1h', '2024-03-01', '2024-03-31')
+    adjusted = DataProcessor.adjust_prices(raw, db_manager.get_corporate_actions('TEST'))
+
+    assert len(raw) == 12
+    np.testing.assert_allclose(raw['close'], [100.0] * 4 + [50.0] * 8)
+    np.testing.assert_allclose(adjusted['close'], 50.0)
+    np.testing.assert_allclose(adjusted['volume'], 20.0)
+
+
+def test_annualization_is_frequency_aware():
+    df = _minute_bars('2024-03-04 09:00', 60 * 24 * 5)
+
+    assert ReturnCalculator.infer_periods_per_year(df.index) == 360 * 252
+    assert ReturnCalculator.infer_periods_per_year(pd.bdate_range('2024-01-01', periods=30)) == 252
+
+
+def test_non_datetime_index_falls_back_to_daily():
+    df = pd.DataFrame({'close': [1.0, 1.1, 1.2, 1.05]})
+
+    assert ReturnCalculator.infer_periods_per_year(df.index) == 252
+    ReturnCalculator.calculate_returns(df.copy())
+    PortfolioAnalyzer.calculate_volatility(df)
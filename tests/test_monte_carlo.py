@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analysis.monte_carlo import MonteCarloSimulator
+
+
+def _stock_data(volatility=0.02, days=250):
+    """构造两只股票的日线收盘价"""
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range('2023-01-02', periods=days)
+    return {
+        code: pd.DataFrame({'close': 10 * np.cumprod(1 + rng.normal(0.0005, volatility, days))}, index=index)
+        for code in ('AAA', 'BBB')
+    }
+
+
+def test_seeded_run_does_not_depend_on_worker_count():
+    n_paths = 2 * MonteCarloSimulator.MIN_PATHS_PER_WORKER
+    stock_data = _stock_data()
+    portfolio = {'AAA': 0.6, 'BBB': 0.4}
+
+    serial = MonteCarloSimulator(n_paths=n_paths, horizon=20, n_workers=1, seed=7).simulate(stock_data, portfolio)
+    parallel = MonteCarloSimulator(n_paths=n_paths, horizon=20, n_workers=2, seed=7).simulate(stock_data, portfolio)
+
+    assert serial['n_workers'] == 1
+    assert parallel['n_workers'] == 2
+    for key in ('terminal_return', 'annual_return', 'max_drawdown', 'var', 'cvar', 'prob_loss'):
+        assert serial[key] == parallel[key]
+
+
+def test_var_and_cvar_on_known_returns():
+    returns = np.arange(-50, 50) / 100
+
+    # 5%分位数在 -0.46 和 -0.45 之间线性插值
+    assert MonteCarloSimulator.calculate_var(returns, 0.95) == pytest.approx(0.4505)
+    # 不超过分位数的是最差的5个值 -0.50 ~ -0.46
+    assert MonteCarloSimulator.calculate_cvar(returns, 0.95) == pytest.approx(0.48)
+
+
+def test_normal_method_never_produces_nan():
+    # 波动率很高时正态分布会抽到低于-100%的日收益率
+    result = MonteCarloSimulator(n_paths=5000, horizon=20, method='normal', seed=3).simulate(
+        _stock_data(volatility=0.5), {'AAA': 0.5, 'BBB': 0.5}
+    )
+
+    for key in ('terminal_return', 'annual_return', 'max_drawdown'):
+        assert all(np.isfinite(value) for value in result[key].values())
+    assert result['annual_return']['p5'] >= -1
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analysis.optimizer import PortfolioOptimizer
+
+
+def _returns(n_assets=4, days=500):
+    """构造预期收益率和波动率各不相同的日收益率矩阵"""
+    rng = np.random.default_rng(0)
+    means = np.linspace(0.0002, 0.001, n_assets)
+    stds = np.linspace(0.01, 0.03, n_assets)
+    return pd.DataFrame(rng.normal(means, stds, size=(days, n_assets)),
+                        columns=[f"S{i}" for i in range(n_assets)])
+
+
+@pytest.mark.parametrize('method', ['min_variance', 'max_sharpe', 'risk_parity'])
+@pytest.mark.parametrize('bounds', [(0.0, 1.0), (0.1, 0.4)])
+def test_weights_satisfy_constraints(method, bounds):
+    optimizer = PortfolioOptimizer(_returns(), bounds=bounds)
+
+    weights = np.array(list(getattr(optimizer, method)().values()))
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert np.all(weights >= bounds[0] - 1e-9)
+    assert np.all(weights <= bounds[1] + 1e-9)
+
+
+def test_frontier_volatility_never_decreases():
+    frontier = PortfolioOptimizer(_returns()).efficient_frontier(n_points=30)
+
+    assert len(frontier) > 1
+    assert np.all(np.diff(frontier['return']) > 0)
+    assert np.all(np.diff(frontier['volatility']) >= -1e-9)
+    np.testing.assert_allclose(frontier[['S0', 'S1', 'S2', 'S3']].sum(axis=1), 1.0)
+
+
+def test_frontier_with_single_feasible_portfolio():
+    # 4只股票上限均为25%时只有等权重组合可行
+    frontier = PortfolioOptimizer(_returns(), bounds=(0, 0.25)).efficient_frontier()
+
+    assert len(frontier) == 1
+    np.testing.assert_allclose(frontier[['S0', 'S1', 'S2', 'S3']].to_numpy(), 0.25)
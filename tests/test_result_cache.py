@@ -0,0 +1,63 @@
+import os
+import pandas as pd
+from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+from src.database.db_manager import DatabaseManager
+from src.database.result_cache import ResultCache
+
+WINDOW = ('1d', '2024-03-08')
+VERSIONS = {'AAPL': 3, 'MSFT': 5}
+
+
+def _key(portfolio_str, settings=None):
+    portfolio = PortfolioAnalyzer.parse_portfolio_input(portfolio_str)
+    return ResultCache.make_key(portfolio, WINDOW, VERSIONS, settings)
+
+
+def test_equivalent_portfolios_share_a_key():
+    assert _key("AAPL,MSFT") == _key("MSFT:0.5,AAPL:0.5") == _key(" aapl : 0.5 , msft ")
+    assert _key("AAPL:0.4,MSFT:0.6") != _key("AAPL:0.6,MSFT:0.4")
+
+
+def test_key_changes_with_result_version_and_settings(monkeypatch):
+    key = _key("AAPL,MSFT", {'n_paths': 20000, 'seed': 42})
+
+    assert key != _key("AAPL,MSFT", {'n_paths': 50000, 'seed': 42})
+    monkeypatch.setattr(ResultCache, 'RESULT_VERSION', ResultCache.RESULT_VERSION + 1)
+    assert key != _key("AAPL,MSFT", {'n_paths': 20000, 'seed': 42})
+
+
+def test_data_version_bumps_only_on_change(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "stock_data.db"))
+    prices = pd.DataFrame({column: [1.0, 2.0] for column in ['open', 'high', 'low', 'close', 'volume']},
+                          index=pd.DatetimeIndex(['2024-03-07', '2024-03-08']))
+
+    db_manager.save_stock_data('AAPL', prices)
+    assert db_manager.get_data_versions(['AAPL', 'MSFT']) == {'AAPL': 1, 'MSFT': 0}
+
+    # 重复写入相同数据不改变版本号
+    db_manager.save_stock_data('AAPL', prices)
+    assert db_manager.get_data_versions(['AAPL'])['AAPL'] == 1
+
+    prices.loc['2024-03-08', 'close'] = 2.5
+    db_manager.save_stock_data('AAPL', prices)
+    assert db_manager.get_data_versions(['AAPL'])['AAPL'] == 2
+
+
+def test_evict_removes_result_and_chart_together(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_size_mb=5000 / 1024 / 1024)
+    chart = tmp_path / "chart.png"
+    chart.write_bytes(b'0' * 1000)
+
+    cache.set('old', {'data': 'x' * 1000}, str(chart))
+    cache.set('middle', {'data': 'x' * 1000}, str(chart))
+    assert cache.get('old') is not None
+
+    # 第三条缓存超出上限，最久未访问的缓存键整体删除
+    for extension in ('pkl', 'png'):
+        os.utime(cache._path('old', extension), (1, 1))
+    cache.set('new', {'data': 'x' * 1000}, str(chart))
+
+    assert not os.path.exists(cache._path('old', 'pkl'))
+    assert not os.path.exists(cache._path('old', 'png'))
+    assert cache.get('middle')[1] == cache._path('middle', 'png')
+    assert cache.get('new')[1] == cache._path('new', 'png')
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analysis.calculator import ReturnCalculator
+from src.analysis.portfolio_analyzer import PortfolioAnalyzer
+from src.analysis.screener import StockScreener
+from src.data.data_processor import DataProcessor
+from src.database.db_manager import DatabaseManager
+
+CODES = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF']
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """构造包含多只股票原始数据的数据库，其中AAA在中途1拆2"""
+    db_path = str(tmp_path / "stock_data.db")
+    db_manager = DatabaseManager(db_path)
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=7), periods=300)
+
+    for i, code in enumerate(CODES):
+        close = 20 * np.cumprod(1 + rng.normal(0.0002 * i, 0.02, len(dates)))
+        if code == 'AAA':
+            close[150:] /= 2
+            db_manager.save_corporate_actions(code, pd.DataFrame(
+                {'dividend': [0.0], 'split': [2.0]}, index=dates[[150]]
+            ))
+        db_manager.save_stock_data(code, pd.DataFrame({
+            'open': close, 'high': close, 'low': close, 'close': close,
+            'volume': np.full(len(dates), 1000.0),
+        }, index=dates))
+    return db_path
+
+
+def test_metrics_match_single_stock_calculators(db_path):
+    result = StockScreener(db_path, n_workers=1).screen(top_k=len(CODES))
+
+    db_manager = DatabaseManager(db_path)
+    assert sorted(result.index) == CODES
+    for code in CODES:
+        df = DataProcessor.adjust_prices(
+            db_manager.get_stock_data(code, '2000-01-01', '2100-01-01'),
+            db_manager.get_corporate_actions(code)
+        )
+        total_return, annual_return = ReturnCalculator.calculate_returns(df.copy())
+
+        row = result.loc[code]
+        assert row['total_return'] == pytest.approx(total_return)
+        assert row['annual_return'] == pytest.approx(annual_return)
+        assert row['volatility'] == pytest.approx(PortfolioAnalyzer.calculate_volatility(df))
+        assert row['max_drawdown'] == pytest.approx(PortfolioAnalyzer.calculate_max_drawdown(df))
+
+    # 拆股已复权，不会表现为约50%的回撤
+    assert result.loc['AAA', 'max_drawdown'] > -0.45
+
+
+def test_top_k_does_not_depend_on_worker_count(db_path):
+    serial = StockScreener(db_path, n_workers=1).screen(sort_expr='annual_return / volatility', top_k=3)
+    parallel = StockScreener(db_path, n_workers=2).screen(sort_expr='annual_return / volatility', top_k=3)
+
+    assert len(serial) == 3
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_scalar_sort_expression_is_rejected(db_path):
+    with pytest.raises(Exception, match="排序表达式"):
+        StockScreener(db_path, n_workers=1).screen(sort_expr='1')